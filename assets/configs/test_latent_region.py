@@ -0,0 +1,92 @@
+"""
+Batch/frame window checks for partial latent reads.
+
+    python assets/configs/test_latent_region.py
+
+Windows are translated into slices for 3D, 4D and 5D shapes, and windows that
+do not fit the stored tensor (including a frame window on a latent without a
+frame axis) must raise LatentRegionError, also when reading real files.
+Needs torch and safetensors; any failure ends with a non-zero exit code.
+"""
+
+import importlib
+import importlib.util
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# (shape, (batch_start, batch_count, frame_start, frame_count), expected slices or "error")
+CASES = [
+    ((4, 16, 16), (0, 0, 0, 0), ()),
+    ((4, 16, 16), (1, 0, 0, 0), "error"),
+    ((4, 16, 16), (0, 0, 1, 0), "error"),
+    ((8, 4, 16, 16), (0, 0, 0, 0), (slice(0, 8),)),
+    ((8, 4, 16, 16), (2, 3, 0, 0), (slice(2, 5),)),
+    ((8, 4, 16, 16), (6, 10, 0, 0), (slice(6, 8),)),
+    ((8, 4, 16, 16), (8, 0, 0, 0), "error"),
+    ((8, 4, 16, 16), (0, 0, 2, 0), "error"),
+    ((8, 4, 16, 16), (0, 0, 0, 4), "error"),
+    ((1, 16, 21, 8, 8), (0, 0, 5, 4), (slice(0, 1), slice(None), slice(5, 9))),
+    ((1, 16, 21, 8, 8), (0, 0, 21, 0), "error"),
+]
+
+
+def load_latent_io():
+    # Only the utils package is loaded; the node package needs ComfyUI
+    spec = importlib.util.spec_from_file_location(
+        "latent_input_utils", os.path.join(ROOT, "utils", "__init__.py"),
+        submodule_search_locations=[os.path.join(ROOT, "utils")],
+    )
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return importlib.import_module(f"{spec.name}.latent_io")
+
+
+def run_cases(latent_io):
+    failures = 0
+    for shape, window, expected in CASES:
+        try:
+            result = latent_io.latent_region_slices(shape, *window)
+        except latent_io.LatentRegionError:
+            result = "error"
+        ok = result == expected
+        failures += not ok
+        print(f"{'✅' if ok else '❌'} shape {list(shape)} window {window}: {result}")
+    return failures
+
+
+def run_files(latent_io):
+    # A frame window on a 4D latent must fail for every decoder, not return the whole tensor
+    import torch
+    import safetensors.torch
+
+    failures = 0
+    samples = torch.randn(2, 4, 8, 8)
+    select = latent_io.make_region_selector(frame_start=1, frame_count=2)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        paths = {"safetensors": os.path.join(temp_dir, "image.latent"), "torch": os.path.join(temp_dir, "image.pt")}
+        safetensors.torch.save_file({"samples": samples}, paths["safetensors"])
+        torch.save({"samples": samples}, paths["torch"])
+        for name, path in paths.items():
+            try:
+                latent_io.load_latent_tensor(path, select)
+                ok = False
+            except latent_io.LatentRegionError:
+                ok = True
+            failures += not ok
+            print(f"{'✅' if ok else '❌'} {name} file with a frame window: {'raised' if ok else 'no error'}")
+    return failures
+
+
+def main():
+    latent_io = load_latent_io()
+    failures = run_cases(latent_io) + run_files(latent_io)
+    print("\nAll checks passed." if not failures else f"\n{failures} check(s) failed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,39 +1,65 @@
 """
-测试提示词分类逻辑
+提示词分类回归测试与吞吐量基准
+
+    python assets/configs/test_prompts.py
+    python assets/configs/test_prompts.py --count 100000 --random 20000
+
+1. 固定测试用例必须全部通过
+2. 随机生成的提示词上，分类器的每种匹配方式（单个和批量）必须与原来的实现结果完全一致
+3. 对比各实现的吞吐量（条/秒）
+没有安装 pyahocorasick 时只测试 scan 匹配方式；任何不一致都会以非零退出码结束
 """
 
-def is_negative_prompt(text):
+import argparse
+import importlib.util
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def load_classifier_module():
+    # 分类器只依赖标准库，直接按文件加载，不需要导入整个节点包（需要ComfyUI）
+    path = os.path.join(ROOT, "utils", "prompt_classifier.py")
+    spec = importlib.util.spec_from_file_location("prompt_classifier", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def legacy_is_negative_prompt(text):
     """
-    判断文本是否为negative prompt
+    原来的实现，作为回归对照
     """
     text_lower = text.lower()
-    
+
     # 首先检查明确的positive关键词
     positive_keywords = ["masterpiece", "best quality", "best"]
     for keyword in positive_keywords:
         if keyword in text_lower:
             return False  # 明确是positive
-    
+
     # 然后检查明确的negative关键词
     negative_keywords = ["worst", "bad"]
     for keyword in negative_keywords:
         if keyword in text_lower:
             return True   # 明确是negative
-    
-    # 如果没有明确关键词，使用其他特征判断
+
     # 以lora标签开头通常是positive
     if text.strip().startswith("<lora:"):
         return False
-    
+
     # 包含更多negative特征词汇
     extended_negative_keywords = [
-        "low quality", "normal quality", "bad anatomy", "bad hands", 
+        "low quality", "normal quality", "bad anatomy", "bad hands",
         "watermark", "signature", "simple background", "transparent"
     ]
     for keyword in extended_negative_keywords:
         if keyword in text_lower:
             return True
-    
+
     # 默认判断为positive（保守策略）
     return False
 
@@ -44,27 +70,116 @@ test_cases = [
     ("masterpiece, best quality, high resolution", False),
     ("<lora:some_model:1.0>, beautiful girl", False),
     ("best art, detailed background", False),
-    
+    ("", False),
+    ("1girl, solo, looking at viewer", False),
+
     # Negative 提示词
     ("worst quality,normal quality,anatomical nonsense,bad anatomy", True),
     ("bad hands, bad fingers, worst quality", True),
     ("low quality, watermark, signature", True),
     ("simple background, transparent", True),
+    ("BAD ANATOMY, Watermark", True),
+
+    # 优先级
+    ("worst quality, masterpiece", False),                 # positive关键词优先于negative关键词
+    ("<lora:x:1.0>, bad anatomy", True),                   # "bad" 属于第二层，优先于lora前缀
+    ("<lora:x:1.0>, watermark", False),                    # lora前缀优先于扩展negative关键词
+    ("  <lora:x:1.0>, signature", False),                  # 前缀判断会先去掉首尾空白
+    ("<LORA:x:1.0>, signature", True),                     # 前缀区分大小写
+    ("bestiary, signature", False),                        # 子串匹配，与原实现一致
 ]
 
-if __name__ == "__main__":
-    print("🧪 测试提示词分类逻辑")
-    print("=" * 50)
-    
+# 生成随机提示词使用的词汇：包含全部关键词、它们的片段和普通标签
+VOCABULARY = [
+    "masterpiece", "best quality", "best", "worst", "bad", "low quality", "normal quality", "bad anatomy",
+    "bad hands", "watermark", "signature", "simple background", "transparent", "Masterpiece", "WORST",
+    "bes", "wor", "ba", "sign", "water", "lowquality", "1girl", "solo", "looking at viewer", "detailed background",
+    "amazing quality", "high resolution", "absurdres", "cinematic lighting", "(smile:1.2)", "blue sky", "cat ears",
+    "nsfw", "jpeg artifacts", "blurry", "extra fingers", "İstanbul", "straße",
+]
+
+
+def random_prompt(rng):
+    tags = rng.choices(VOCABULARY, k=rng.randint(0, 30))
+    text = rng.choice([", ", ",", " ", ",\n"]).join(tags)
+    if rng.random() < 0.2:
+        text = rng.choice(["<lora:detail:0.5>, ", " <lora:style:1.0>", "<LORA:x:1>"]) + text
+    return text
+
+
+def run_cases(classifiers):
+    failures = 0
     for i, (text, expected) in enumerate(test_cases, 1):
-        result = is_negative_prompt(text)
-        status = "✅" if result == expected else "❌"
-        prompt_type = "Negative" if result else "Positive"
+        results = {"legacy": legacy_is_negative_prompt(text)}
+        for name, classifier in classifiers.items():
+            results[name] = classifier.is_negative(text)
+            results[f"{name} batch"] = classifier.classify_many([text])[0]
+        ok = all(result == expected for result in results.values())
+        failures += not ok
         expected_type = "Negative" if expected else "Positive"
-        
-        print(f"{status} 测试 {i}: {prompt_type}")
-        print(f"   预期: {expected_type}")
-        print(f"   文本: {text[:50]}...")
-        print()
-    
-    print("测试完成！") 
\ No newline at end of file
+        print(f"{'✅' if ok else '❌'} 测试 {i}: 预期 {expected_type}  {results}")
+        print(f"   文本: {text[:50]!r}")
+    return failures
+
+
+def run_differential(classifiers, prompts):
+    expected = [legacy_is_negative_prompt(text) for text in prompts]
+    mismatches = 0
+    for name, classifier in classifiers.items():
+        single = [classifier.is_negative(text) for text in prompts]
+        batch = classifier.classify_many(prompts)
+        wrong = [text for text, a, b, c in zip(prompts, expected, single, batch) if not a == b == c]
+        for text in wrong[:10]:
+            print(f"❌ {name} 不一致: {text!r}")
+        print(f"   {name}: 不一致 {len(wrong)}")
+        mismatches += len(wrong)
+    return mismatches
+
+
+def throughput(name, function, prompts, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(prompts)
+        best = min(best, time.perf_counter() - start)
+    print(f"   {name:<24} {len(prompts) / best:>12,.0f} 条/秒  ({best * 1000:.1f} ms)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--random", type=int, default=5000, help="随机回归测试的提示词数量")
+    parser.add_argument("--count", type=int, default=20000, help="吞吐量测试的提示词数量")
+    parser.add_argument("--repeat", type=int, default=5, help="吞吐量测试重复次数（取最快一次）")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--config", help="关键词配置文件（默认 assets/configs/prompt_keywords.json）")
+    args = parser.parse_args(argv)
+
+    module = load_classifier_module()
+    classifiers = {"scan": module.PromptClassifier.from_config(args.config, matcher="scan")}
+    try:
+        classifiers["ahocorasick"] = module.PromptClassifier.from_config(args.config, matcher="ahocorasick")
+    except ImportError:
+        print("未安装 pyahocorasick，跳过自动机匹配方式")
+    rng = random.Random(args.seed)
+
+    print("🧪 测试提示词分类逻辑")
+    print("=" * 50)
+    failures = run_cases(classifiers)
+
+    print(f"\n🎲 随机回归测试: {args.random} 条")
+    mismatches = run_differential(classifiers, [random_prompt(rng) for _ in range(args.random)])
+
+    print(f"\n⏱️ 吞吐量: {args.count} 条（其中约一半重复）")
+    unique = [random_prompt(rng) for _ in range(args.count // 2)]
+    prompts = unique + rng.choices(unique, k=args.count - len(unique))
+    throughput("legacy", lambda texts: [legacy_is_negative_prompt(text) for text in texts], prompts, args.repeat)
+    for name, classifier in classifiers.items():
+        throughput(f"{name} is_negative", lambda texts: [classifier.is_negative(text) for text in texts], prompts, args.repeat)
+        throughput(f"{name} classify_many", classifier.classify_many, prompts, args.repeat)
+
+    print("\n测试完成！" if not failures and not mismatches else f"\n失败: {failures} 个用例, {mismatches} 条不一致")
+    return 1 if failures or mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""
+采样器提示词追踪测试
+
+    python assets/configs/test_workflow_graph.py
+
+UI格式的workflow中，文本编码节点和采样器之间经过Reroute节点时也必须追踪到提示词；
+只依赖标准库，任何用例失败都会以非零退出码结束
+"""
+
+import importlib.util
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def load_utils_module(name):
+    # 只加载utils包（节点包需要ComfyUI）
+    if "latent_input_utils" in sys.modules:
+        return importlib.import_module(f"latent_input_utils.{name}")
+    spec = importlib.util.spec_from_file_location(
+        "latent_input_utils", os.path.join(ROOT, "utils", "__init__.py"),
+        submodule_search_locations=[os.path.join(ROOT, "utils")],
+    )
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return importlib.import_module(f"{spec.name}.{name}")
+
+
+def encoder(node_id, text):
+    return {"id": node_id, "type": "CLIPTextEncode", "widgets_values": [text],
+            "inputs": [{"name": "clip", "type": "CLIP", "link": None}],
+            "outputs": [{"name": "CONDITIONING", "type": "CONDITIONING", "links": []}]}
+
+
+def reroute(node_id, link):
+    return {"id": node_id, "type": "Reroute", "inputs": [{"name": "", "type": "*", "link": link}],
+            "outputs": [{"name": "", "type": "CONDITIONING", "links": []}]}
+
+
+def sampler(node_id, positive_link, negative_link):
+    return {"id": node_id, "type": "KSampler", "widgets_values": [0, "fixed", 20, 7.0, "euler", "normal", 1.0],
+            "inputs": [{"name": "positive", "type": "CONDITIONING", "link": positive_link},
+                       {"name": "negative", "type": "CONDITIONING", "link": negative_link}]}
+
+
+# positive: 1 -> Reroute 5 -> KSampler 3；negative: 2 -> Reroute 6 -> Reroute 7 -> KSampler 3
+REROUTED = {
+    "nodes": [encoder(1, "a red fox in the snow"), encoder(2, "blurry, watermark"), sampler(3, 11, 14),
+              reroute(5, 10), reroute(6, 12), reroute(7, 13)],
+    "links": [
+        [10, 1, 0, 5, 0, "CONDITIONING"],
+        [11, 5, 0, 3, 0, "CONDITIONING"],
+        [12, 2, 0, 6, 0, "CONDITIONING"],
+        [13, 6, 0, 7, 0, "CONDITIONING"],
+        [14, 7, 0, 3, 1, "CONDITIONING"],
+    ],
+}
+
+# 新版前端的字典形式连线，Reroute的输入没有连接
+DANGLING = {
+    "nodes": [encoder(1, "a red fox in the snow"), sampler(3, 11, 12), reroute(5, None)],
+    "links": [
+        {"id": 11, "origin_id": 1, "origin_slot": 0, "target_id": 3, "target_slot": 0, "type": "CONDITIONING"},
+        {"id": 12, "origin_id": 5, "origin_slot": 0, "target_id": 3, "target_slot": 1, "type": "CONDITIONING"},
+    ],
+}
+
+# (名称, workflow, 预期的 (positive, negative))
+CASES = [
+    ("Reroute", REROUTED, ("a red fox in the snow", "blurry, watermark")),
+    ("未连接的Reroute", DANGLING, ("a red fox in the snow", "")),
+]
+
+
+def main():
+    workflow_graph = load_utils_module("workflow_graph")
+    workflow_parser = load_utils_module("workflow_parser")
+    failures = 0
+    for name, workflow, expected in CASES:
+        results = {
+            "sampler_prompts": workflow_graph.WorkflowGraph(workflow).sampler_prompts(),
+            "parse_workflow_data": workflow_parser.WorkflowParser().parse_workflow_data(workflow)[::2],
+        }
+        ok = all(result == expected for result in results.values())
+        failures += not ok
+        print(f"{'✅' if ok else '❌'} {name}: 预期 {expected}  {results}")
+
+    print("\n测试完成！" if not failures else f"\n失败: {failures} 个用例")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+"""
+workflow元数据索引的查询测试
+
+    python assets/configs/test_workflow_index.py
+
+在临时目录中生成带workflow的PNG，建立索引后按checkpoint名称的各个部分查询；
+需要Pillow，任何查询失败都会以非零退出码结束
+"""
+
+import importlib.util
+import json
+import os
+import sys
+import tempfile
+
+from PIL import Image
+from PIL.PngImagePlugin import PngInfo
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CHECKPOINT = "sdxl/juggernaut_v9.safetensors"
+
+WORKFLOW = {
+    "nodes": [
+        {"id": 1, "type": "CheckpointLoaderSimple", "widgets_values": [CHECKPOINT]},
+        {"id": 2, "type": "CLIPTextEncode", "title": "positive_prompt", "widgets_values": ["a red fox in the snow"]},
+    ],
+    "links": [],
+}
+
+# (查询, 是否应该找到图片)
+QUERIES = [
+    ("juggernaut", True),
+    ("v9", True),
+    ("safetensors", True),
+    ("juggernaut_v9", True),
+    (CHECKPOINT, True),
+    ("checkpoint:juggernaut", True),
+    ("jugg*", True),
+    ("fox", True),
+    ("sd15", False),
+]
+
+
+def load_utils_package():
+    # 只加载utils包（节点包需要ComfyUI）
+    spec = importlib.util.spec_from_file_location(
+        "latent_input_utils", os.path.join(ROOT, "utils", "__init__.py"),
+        submodule_search_locations=[os.path.join(ROOT, "utils")],
+    )
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return importlib.import_module(f"{spec.name}.workflow_index")
+
+
+def main():
+    workflow_index = load_utils_package()
+    failures = 0
+    with tempfile.TemporaryDirectory() as temp_dir:
+        image_dir = os.path.join(temp_dir, "input")
+        os.makedirs(image_dir)
+        info = PngInfo()
+        info.add_text("workflow", json.dumps(WORKFLOW))
+        Image.new("RGB", (8, 8)).save(os.path.join(image_dir, "fox.png"), pnginfo=info)
+
+        index = workflow_index.WorkflowMetadataIndex(os.path.join(temp_dir, "index.sqlite3"), {"input": image_dir})
+        index.refresh()
+        for query, expected in QUERIES:
+            found = [result["path"] for result in index.search(query)] == ["fox.png"]
+            ok = found == expected
+            failures += not ok
+            print(f"{'✅' if ok else '❌'} {query!r}: {'找到' if found else '未找到'}")
+
+    print("\n测试完成！" if not failures else f"\n失败: {failures} 个查询")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,543 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Reproducible benchmarks for the latent loading and workflow parsing hot paths.
+
+    python benchmarks/run_benchmarks.py --output results.json
+    python benchmarks/run_benchmarks.py --compare baseline.json --output results.json
+    python benchmarks/run_benchmarks.py --quick --filter latent_load
+
+Synthetic latents (several shapes, dtypes and container formats) and images
+(PNG/JPEG/WebP with embedded workflows of 10 to 5000 nodes) are generated
+into a temporary directory. Every case runs in a fresh process; its peak RSS
+delta is measured from the RSS after the case's setup, so imports and fixtures
+do not mask what the case itself allocates. ComfyUI's `folder_paths` is replaced by the stub in
+benchmarks/stubs, so no ComfyUI checkout or GPU is needed; torch, safetensors,
+numpy and Pillow must be installed.
+"""
+
+import argparse
+import contextlib
+import importlib
+import importlib.util
+import io
+import json
+import multiprocessing
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STUBS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "stubs")
+PACKAGE_NAME = "comfyui_latentinput"
+
+# (name, shape, dtype, container format)
+LATENT_SPECS = [
+    ("sd15_single", (1, 4, 64, 64), "float32", "safetensors"),
+    ("sdxl_batch8", (8, 4, 128, 128), "float32", "safetensors"),
+    ("sdxl_batch8_fp16", (8, 4, 128, 128), "float16", "safetensors"),
+    ("sdxl_batch8_multikey", (8, 4, 128, 128), "float32", "safetensors_multikey"),
+    ("sdxl_batch8_torch_zip", (8, 4, 128, 128), "float32", "torch_zip"),
+    ("sdxl_batch8_torch_pickle", (8, 4, 128, 128), "float32", "torch_pickle"),
+    ("sdxl_batch8_container", (8, 4, 128, 128), "float32", "latent_container"),
+    ("video_5d", (1, 16, 21, 60, 104), "float32", "safetensors"),
+]
+QUICK_LATENTS = {"sd15_single", "sdxl_batch8", "sdxl_batch8_torch_pickle", "sdxl_batch8_container"}
+
+WORKFLOW_NODE_COUNTS = [10, 100, 1000, 5000]
+QUICK_NODE_COUNTS = [10, 1000]
+IMAGE_FORMATS = ["png", "jpeg", "webp"]
+IMAGE_SIZE = (1024, 1024)
+# Square sizes for the uint8 -> float conversion cases
+CONVERSION_SIZES = [2048, 8192]
+QUICK_CONVERSION_SIZES = [2048]
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Package import with the folder_paths stub
+# ----------------------------------------------------------------------------------------------------------------------
+def import_package(base_dir):
+    """Import the custom node package under PACKAGE_NAME with folder_paths pointing at `base_dir`."""
+    if STUBS not in sys.path:
+        sys.path.insert(0, STUBS)
+    import folder_paths
+    folder_paths.set_base_directory(base_dir)
+
+    if PACKAGE_NAME not in sys.modules:
+        spec = importlib.util.spec_from_file_location(
+            PACKAGE_NAME, os.path.join(ROOT, "__init__.py"), submodule_search_locations=[ROOT]
+        )
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[PACKAGE_NAME] = module
+        # The package prints its node list on import
+        with contextlib.redirect_stdout(io.StringIO()):
+            spec.loader.exec_module(module)
+    return sys.modules[PACKAGE_NAME]
+
+
+def stub_folder_paths():
+    import folder_paths
+    return folder_paths
+
+
+def submodule(name):
+    """Import a package submodule directly so import errors surface instead of being logged."""
+    return importlib.import_module(f"{PACKAGE_NAME}.{name}")
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Synthetic data
+# ----------------------------------------------------------------------------------------------------------------------
+_FILLER_TYPES = ["CLIPTextEncode", "KSampler", "VAEDecode", "LoraLoader", "EmptyLatentImage", "Reroute", "Note", "SaveImage"]
+_WORDS = ["masterpiece", "portrait", "landscape", "detailed", "cinematic", "lighting", "forest", "city", "night", "sunset"]
+
+
+def make_workflow(node_count, seed=0):
+    """Build a UI-format workflow with `node_count` nodes; the nodes the parser looks for are placed last."""
+    rng = random.Random(seed)
+    nodes = []
+    for node_id in range(1, max(node_count - 3, 0) + 1):
+        node_type = _FILLER_TYPES[node_id % len(_FILLER_TYPES)]
+        nodes.append({
+            "id": node_id,
+            "type": node_type,
+            "pos": [rng.uniform(0, 4000), rng.uniform(0, 4000)],
+            "size": [270, 106],
+            "properties": {"cnr_id": "comfy-core", "Node name for S&R": node_type},
+            "widgets_values": [", ".join(rng.choice(_WORDS) for _ in range(12)), rng.randint(0, 2**31)],
+        })
+    next_id = len(nodes) + 1
+    nodes.extend([
+        {"id": next_id, "type": "CLIPTextEncode", "title": "positive_prompt",
+         "properties": {"cnr_id": "comfy-core", "Node name for S&R": "CLIPTextEncode"},
+         "widgets_values": ["masterpiece, best quality, 1girl, detailed background"]},
+        {"id": next_id + 1, "type": "CLIPTextEncode", "title": "negative_prompt",
+         "properties": {"cnr_id": "comfy-core", "Node name for S&R": "CLIPTextEncode"},
+         "widgets_values": ["worst quality, low quality, watermark"]},
+        {"id": next_id + 2, "type": "CheckpointLoaderSimple",
+         "properties": {"cnr_id": "comfy-core", "Node name for S&R": "CheckpointLoaderSimple"},
+         "widgets_values": ["sdxl/benchmark_model.safetensors"]},
+    ][:node_count])
+    return {"last_node_id": len(nodes), "last_link_id": 0, "nodes": nodes, "links": [], "version": 0.4}
+
+
+def write_latents(input_dir, specs):
+    import torch
+    import safetensors.torch
+    save_latent_container = submodule("utils.latent_container").save_latent_container
+
+    generator = torch.Generator().manual_seed(0)
+    for name, shape, dtype, fmt in specs:
+        samples = torch.randn(shape, generator=generator).to(getattr(torch, dtype))
+        path = os.path.join(input_dir, f"{name}.latent")
+        if fmt == "safetensors":
+            safetensors.torch.save_file({"samples": samples}, path)
+        elif fmt == "safetensors_multikey":
+            # Extra keys the loader has to skip over
+            safetensors.torch.save_file({"noise": torch.randn(shape, generator=generator), "samples": samples,
+                                         "noise_mask": torch.ones(shape)}, path)
+        elif fmt == "torch_zip":
+            torch.save({"samples": samples}, path)
+        elif fmt == "torch_pickle":
+            torch.save({"samples": samples}, path, _use_new_zipfile_serialization=False)
+        elif fmt == "latent_container":
+            save_latent_container(path, {"samples": samples}, codec="zlib", level=1)
+
+
+def write_images(input_dir, node_counts, formats, size):
+    import numpy as np
+    from PIL import Image
+    from PIL.PngImagePlugin import PngInfo
+
+    rng = np.random.default_rng(0)
+    # Smooth gradients plus noise compress like photos rather than like pure noise
+    gradient = np.linspace(0, 255, size[0], dtype=np.float32)[None, :, None]
+    pixels = np.clip(gradient + rng.normal(0, 20, (size[1], size[0], 3)), 0, 255).astype(np.uint8)
+    image = Image.fromarray(pixels, "RGB")
+
+    written = []
+    for node_count in node_counts:
+        workflow_text = json.dumps(make_workflow(node_count))
+        for fmt in formats:
+            name = f"workflow_{node_count}.{fmt}"
+            path = os.path.join(input_dir, name)
+            try:
+                if fmt == "png":
+                    info = PngInfo()
+                    info.add_text("workflow", workflow_text)
+                    image.save(path, pnginfo=info)
+                else:
+                    exif = Image.Exif()
+                    exif[0x010E] = workflow_text  # ImageDescription
+                    image.save(path, quality=90, exif=exif)
+            except (ValueError, OSError):
+                # JPEG APP1 segments are limited to 64 KiB, so large workflows do not fit
+                continue
+            written.append((fmt, node_count, name))
+    return written
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Cases: each returns (callable, work amount per call, work unit)
+# ----------------------------------------------------------------------------------------------------------------------
+class CaseSkipped(Exception):
+    """Raised by a case that cannot run in this environment (e.g. an optional package is missing)."""
+
+
+def case_latent_load(params):
+    loader = submodule("nodes.latent_nodes").LatentLoaderAdvanced()
+    latent_file = f"input/{params['latent']}.latent"
+    work = os.path.getsize(os.path.join(stub_folder_paths().get_input_directory(), f"{params['latent']}.latent"))
+    # Reduce over the result so every byte is read, even if a loader ever hands out a lazily mapped tensor
+    return (lambda: float(loader.load_latent(latent_file)[0]["samples"].sum())), work, "bytes"
+
+
+def case_image_load_and_parse(params):
+    loader = submodule("nodes.image_processing_nodes").WorkflowImageFileLoader()
+    # max_size downscales the output; only JPEG decodes at reduced resolution (draft mode), PNG/WebP decode in full
+    # and pay for the resize on top. Work is still counted in source pixels
+    max_size = params.get("max_size", 0)
+    return (lambda: loader.load_and_parse(params["image"], max_width=max_size, max_height=max_size)), IMAGE_SIZE[0] * IMAGE_SIZE[1], "pixels"
+
+
+def case_metadata_load(params):
+    loader = submodule("nodes.image_processing_nodes").WorkflowMetadataLoader()
+    return (lambda: loader.load_metadata(params["image"])), 1, "images"
+
+
+def case_node_extract_workflow(params):
+    loader = submodule("nodes.image_processing_nodes").WorkflowImageFileLoader()
+    path = os.path.join(stub_folder_paths().get_input_directory(), params["image"])
+    return (lambda: loader.extract_workflow_from_image(path)), 1, "images"
+
+
+def case_helpers_extract_workflow(params):
+    extract = submodule("utils.image_helpers").extract_workflow_from_image
+    path = os.path.join(stub_folder_paths().get_input_directory(), params["image"])
+    return (lambda: extract(path)), 1, "images"
+
+
+def _conversion_image(params):
+    from PIL import Image
+    # effect_noise allocates only the PIL image, so setup does not raise the RSS peak above the measured conversion
+    image = Image.effect_noise((params["size"], params["size"]), 64).convert(params.get("mode", "RGB"))
+    image.load()
+    return image
+
+
+def case_to_tensor_legacy(params):
+    import numpy as np
+    import torch
+    image = _conversion_image(params)
+
+    def convert():
+        img = image.convert("RGB") if image.mode != "RGB" else image
+        return torch.from_numpy(np.array(img).astype(np.float32) / 255.0).unsqueeze(0)
+    return convert, params["size"] ** 2, "pixels"
+
+
+def case_pil_to_tensor(params):
+    import torch
+    pil_to_tensor = submodule("utils.image_helpers").pil_to_tensor
+    image = _conversion_image(params)
+    dtype = getattr(torch, params["dtype"])
+    return (lambda: pil_to_tensor(image, dtype)), params["size"] ** 2, "pixels"
+
+
+def case_parse_workflow_data(params):
+    parser = submodule("nodes.image_processing_nodes").WorkflowParser()
+    workflow = make_workflow(params["nodes"])
+    return (lambda: parser.parse_workflow_data(workflow)), params["nodes"], "nodes"
+
+
+def case_json_loads(params):
+    try:
+        loads = submodule("utils.json_backend").BACKENDS[params["backend"]]()
+    except ImportError:
+        raise CaseSkipped(f"{params['backend']} is not installed")
+    text = json.dumps(make_workflow(params["nodes"]))
+    return (lambda: loads(text)), len(text), "bytes"
+
+
+CASES = {
+    "latent_load": case_latent_load,
+    "image_load_and_parse": case_image_load_and_parse,
+    "metadata_load": case_metadata_load,
+    "node_extract_workflow": case_node_extract_workflow,
+    "helpers_extract_workflow": case_helpers_extract_workflow,
+    "parse_workflow_data": case_parse_workflow_data,
+    "to_tensor_legacy": case_to_tensor_legacy,
+    "pil_to_tensor": case_pil_to_tensor,
+    "json_loads": case_json_loads,
+}
+
+
+def build_plan(images, quick):
+    """Return the list of (case name, params) to run."""
+    plan = []
+    for name, _, _, _ in LATENT_SPECS:
+        if quick and name not in QUICK_LATENTS:
+            continue
+        plan.append(("latent_load", {"latent": name, "cache_mb": 0}))
+    plan.append(("latent_load", {"latent": "sdxl_batch8", "cache_mb": 1024}))
+    for fmt, node_count, image_name in images:
+        params = {"image": image_name, "format": fmt, "nodes": node_count}
+        plan.append(("image_load_and_parse", params))
+        plan.append(("image_load_and_parse", dict(params, max_size=256)))
+        plan.append(("metadata_load", params))
+        plan.append(("node_extract_workflow", params))
+        plan.append(("helpers_extract_workflow", params))
+    for node_count in (QUICK_NODE_COUNTS if quick else WORKFLOW_NODE_COUNTS):
+        plan.append(("parse_workflow_data", {"nodes": node_count}))
+        for backend in ("json", "orjson", "simdjson", "ujson"):
+            plan.append(("json_loads", {"nodes": node_count, "backend": backend}))
+    # The legacy np.array().astype()/255 conversion is kept as the reference for peak RSS
+    for size in (QUICK_CONVERSION_SIZES if quick else CONVERSION_SIZES):
+        plan.append(("to_tensor_legacy", {"size": size}))
+        for dtype in ("float32", "float16", "bfloat16"):
+            plan.append(("pil_to_tensor", {"size": size, "dtype": dtype}))
+    return plan
+
+
+def case_id(case_name, params):
+    return case_name + "[" + ",".join(f"{k}={v}" for k, v in sorted(params.items())) + "]"
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Measurement
+# ----------------------------------------------------------------------------------------------------------------------
+def current_rss_bytes():
+    """Resident set size of this process right now, or None if it cannot be read here."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().rss
+
+
+def _kernel_peak_rss_bytes():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) * 1024
+    raise OSError("VmHWM not reported")
+
+
+class PeakRssMonitor:
+    """
+    Peak RSS between start() and stop(), relative to the RSS at start().
+
+    ru_maxrss cannot be used: it is the high-water mark since the process started, and importing torch already sets it
+    above what most cases reach. On Linux the kernel high-water mark is reset through /proc/self/clear_refs, which is
+    exact; elsewhere a thread samples the current RSS every `interval` seconds and can miss very short spikes.
+    """
+
+    def __init__(self, interval=0.001):
+        self.interval = interval
+        self.baseline = None
+        self._peak = None
+        self._kernel = False
+        self._stop = None
+        self._thread = None
+
+    def start(self):
+        import gc
+        import threading
+        gc.collect()
+        self.baseline = self._peak = current_rss_bytes()
+        try:
+            with open("/proc/self/clear_refs", "w") as f:
+                f.write("5")
+            _kernel_peak_rss_bytes()
+            self._kernel = True
+            return
+        except OSError:
+            self._kernel = False
+        if self.baseline is None:
+            return
+        self._stop = threading.Event()
+
+        def sample():
+            while not self._stop.wait(self.interval):
+                self._peak = max(self._peak, current_rss_bytes())
+        self._thread = threading.Thread(target=sample, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Return the peak RSS in bytes, or None if RSS cannot be read on this platform."""
+        if self._kernel:
+            return _kernel_peak_rss_bytes()
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._peak = max(self._peak, current_rss_bytes())
+        return self._peak
+
+
+def _run_case_in_child(case_name, params, base_dir, min_time, max_iterations, conn):
+    try:
+        # Cache budgets are read when the package is imported; cases measure the uncached path unless they set cache_mb
+        os.environ["LATENT_INPUT_CACHE_MB"] = str(params.get("cache_mb", 0))
+        os.environ["LATENT_INPUT_IMAGE_CACHE_MB"] = str(params.get("cache_mb", 0))
+        import_package(base_dir)
+        fn, work, unit = CASES[case_name](params)
+
+        # Setup (imports, fixtures) is part of the baseline; only what the case itself allocates counts
+        monitor = PeakRssMonitor()
+        monitor.start()
+        fn()  # warm-up, also populates the cache for cached cases
+        timings = []
+        started = time.perf_counter()
+        while len(timings) < 3 or (time.perf_counter() - started < min_time and len(timings) < max_iterations):
+            t0 = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - t0)
+        peak_rss = monitor.stop()
+
+        median = statistics.median(timings)
+        conn.send({
+            "id": case_id(case_name, params),
+            "case": case_name,
+            "params": params,
+            "iterations": len(timings),
+            "median_s": median,
+            "min_s": min(timings),
+            "mean_s": statistics.fmean(timings),
+            "throughput": work / median if median > 0 else None,
+            "throughput_unit": f"{unit}/s",
+            "peak_rss_mb": peak_rss / 2**20 if peak_rss is not None else None,
+            "peak_rss_delta_mb": (peak_rss - monitor.baseline) / 2**20 if peak_rss is not None else None,
+        })
+    except CaseSkipped as e:
+        conn.send({"id": case_id(case_name, params), "case": case_name, "params": params, "skipped": str(e)})
+    except Exception as e:
+        conn.send({"id": case_id(case_name, params), "case": case_name, "params": params, "error": repr(e)})
+    finally:
+        conn.close()
+
+
+def run_case(case_name, params, base_dir, min_time, max_iterations):
+    ctx = multiprocessing.get_context("spawn")
+    parent_conn, child_conn = ctx.Pipe(duplex=False)
+    process = ctx.Process(target=_run_case_in_child, args=(case_name, params, base_dir, min_time, max_iterations, child_conn))
+    process.start()
+    child_conn.close()
+    try:
+        result = parent_conn.recv()
+    except EOFError:
+        result = {"id": case_id(case_name, params), "case": case_name, "params": params, "error": "benchmark process crashed"}
+    process.join()
+    return result
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Reporting
+# ----------------------------------------------------------------------------------------------------------------------
+def environment_info():
+    info = {"python": platform.python_version(), "platform": platform.platform(), "machine": platform.machine()}
+    for module_name in ("torch", "safetensors", "numpy", "PIL"):
+        try:
+            info[module_name] = importlib.import_module(module_name).__version__
+        except Exception:
+            info[module_name] = None
+    try:
+        info["commit"] = subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        info["commit"] = None
+    return info
+
+
+def compare(results, baseline, threshold):
+    """Print cases that got slower or hungrier than `baseline` by more than `threshold`. Returns the regression count."""
+    previous = {r["id"]: r for r in baseline.get("results", []) if "error" not in r}
+    regressions = 0
+    for result in results:
+        old = previous.get(result["id"])
+        if old is None or "error" in result:
+            continue
+        time_ratio = result["median_s"] / old["median_s"] if old["median_s"] else 1.0
+        rss_old, rss_new = old.get("peak_rss_delta_mb"), result.get("peak_rss_delta_mb")
+        rss_regressed = rss_old is not None and rss_new is not None and rss_new > max(rss_old * (1 + threshold), rss_old + 8)
+        flags = []
+        if time_ratio > 1 + threshold:
+            flags.append(f"time x{time_ratio:.2f}")
+        if rss_regressed:
+            flags.append(f"peak RSS +{rss_new - rss_old:.1f} MB")
+        if flags:
+            regressions += 1
+            print(f"REGRESSION {result['id']}: {', '.join(flags)}")
+        elif time_ratio < 1 - threshold:
+            print(f"improved   {result['id']}: time x{time_ratio:.2f}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", help="Write the results as JSON to this file.")
+    parser.add_argument("--compare", help="Baseline JSON produced by an earlier run.")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Relative slowdown reported as a regression (default: 0.15).")
+    parser.add_argument("--filter", default="", help="Only run cases whose id contains this text.")
+    parser.add_argument("--quick", action="store_true", help="Run a reduced set of shapes and workflow sizes.")
+    parser.add_argument("--min-time", type=float, default=0.5, help="Minimum measured seconds per case.")
+    parser.add_argument("--max-iterations", type=int, default=50)
+    parser.add_argument("--keep-data", help="Generate the synthetic data into this directory and keep it.")
+    args = parser.parse_args(argv)
+
+    base_dir = os.path.abspath(args.keep_data) if args.keep_data else tempfile.mkdtemp(prefix="latentinput-bench-")
+    try:
+        import_package(base_dir)
+        input_dir = stub_folder_paths().get_input_directory()
+        specs = [spec for spec in LATENT_SPECS if not args.quick or spec[0] in QUICK_LATENTS]
+        print(f"Generating synthetic data in {base_dir} ...")
+        write_latents(input_dir, specs)
+        images = write_images(input_dir, QUICK_NODE_COUNTS if args.quick else WORKFLOW_NODE_COUNTS, IMAGE_FORMATS, IMAGE_SIZE)
+
+        results = []
+        skipped = []
+        for case_name, params in build_plan(images, args.quick):
+            if args.filter and args.filter not in case_id(case_name, params):
+                continue
+            result = run_case(case_name, params, base_dir, args.min_time, args.max_iterations)
+            if "skipped" in result:
+                # Not a failure: the case does not apply to this environment
+                skipped.append(result)
+                print(f"{result['id']}: skipped ({result['skipped']})")
+                continue
+            results.append(result)
+            if "error" in result:
+                print(f"{result['id']}: ERROR {result['error']}")
+            else:
+                rss = f"{result['peak_rss_delta_mb']:.1f} MB" if result["peak_rss_delta_mb"] is not None else "n/a"
+                print(f"{result['id']}: median {result['median_s'] * 1000:.2f} ms, "
+                      f"{result['throughput']:.4g} {result['throughput_unit']}, peak RSS +{rss}")
+    finally:
+        if not args.keep_data:
+            shutil.rmtree(base_dir, ignore_errors=True)
+
+    report = {"environment": environment_info(), "results": results, "skipped": skipped}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 1 if any("error" in r for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""
+Minimal stand-in for ComfyUI's `folder_paths` module, so the nodes can be
+benchmarked without a ComfyUI checkout. All directories live below
+BENCHMARK_BASE_DIR (or the directory passed to `set_base_directory`).
+"""
+
+import os
+
+base_directory = os.environ.get("BENCHMARK_BASE_DIR", os.path.abspath("benchmark_data"))
+
+
+def set_base_directory(path):
+    global base_directory
+    base_directory = os.path.abspath(path)
+
+
+def _subdir(name):
+    path = os.path.join(base_directory, name)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def get_input_directory():
+    return _subdir("input")
+
+
+def get_output_directory():
+    return _subdir("output")
+
+
+def get_temp_directory():
+    return _subdir("temp")
+
+
+def get_user_directory():
+    return _subdir("user")
+
+
+def get_annotated_filepath(name):
+    # "name [output]" style annotations select the directory; the default is input
+    for suffix, directory in ((" [output]", get_output_directory), (" [temp]", get_temp_directory), (" [input]", get_input_directory)):
+        if name.endswith(suffix):
+            return os.path.join(directory(), name[:-len(suffix)])
+    return os.path.join(get_input_directory(), name)
+
+
+def get_save_image_path(filename_prefix, output_dir, image_width=0, image_height=0):
+    subfolder, filename = os.path.split(os.path.normpath(filename_prefix))
+    full_output_folder = os.path.join(output_dir, subfolder)
+    os.makedirs(full_output_folder, exist_ok=True)
+    counter = len(os.listdir(full_output_folder)) + 1
+    return full_output_folder, filename, counter, subfolder, filename_prefix
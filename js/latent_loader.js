@@ -59,6 +59,94 @@ app.registerExtension({
 					inputEl.click();
 				});
 
+				// Catalog browser: lists latents already in the input directory with their shapes
+				const showCatalog = () => {
+					const dialog = document.createElement("div");
+					Object.assign(dialog.style, {
+						position: "fixed", top: "10%", left: "50%", transform: "translateX(-50%)",
+						width: "640px", maxHeight: "70%", display: "flex", flexDirection: "column",
+						background: "var(--comfy-menu-bg, #222)", color: "var(--fg-color, #ddd)",
+						border: "1px solid var(--border-color, #444)", borderRadius: "6px",
+						padding: "8px", zIndex: 10000, fontSize: "13px",
+					});
+
+					const filterEl = document.createElement("input");
+					filterEl.type = "text";
+					filterEl.placeholder = "Filter by name, key, dtype or shape";
+					filterEl.style.marginBottom = "6px";
+
+					const listEl = document.createElement("div");
+					listEl.style.overflowY = "auto";
+
+					const close = () => {
+						document.removeEventListener("keydown", onKeyDown);
+						dialog.remove();
+					};
+					const onKeyDown = (e) => {
+						if (e.key === "Escape") close();
+					};
+					document.addEventListener("keydown", onKeyDown);
+
+					const describe = (record) => Object.entries(record.tensors || {})
+						.map(([key, info]) => `${key} ${info.dtype} [${(info.shape || []).join(", ")}]`)
+						.join("; ") || record.format || "unknown format";
+
+					let requestId = 0;
+					// Only opening the dialog rescans the directory; filtering reads the server's in-memory catalog
+					const refresh = async (scan) => {
+						const current = ++requestId;
+						const params = new URLSearchParams({ q: filterEl.value, limit: "500", scan: scan ? "1" : "0" });
+						const resp = await api.fetchApi(`/latent_input/catalog?${params}`);
+						if (current !== requestId) return; // a newer filter is already in flight
+						listEl.replaceChildren();
+						if (resp.status !== 200) {
+							listEl.textContent = `Catalog Error: ${resp.status} - ${resp.statusText}`;
+							return;
+						}
+						const { files } = await resp.json();
+						if (!files.length) {
+							listEl.textContent = "No latent files found in the input directory.";
+						}
+						for (const record of files) {
+							const row = document.createElement("div");
+							row.style.cssText = "padding: 3px 4px; cursor: pointer; border-bottom: 1px solid var(--border-color, #333);";
+							row.textContent = `${record.path} — ${describe(record)}`;
+							row.title = record.latent_file;
+							row.addEventListener("click", () => {
+								const textWidget = this.widgets.find((w) => w.name === "latent_file");
+								if (textWidget) {
+									textWidget.value = record.latent_file;
+								}
+								close();
+							});
+							listEl.appendChild(row);
+						}
+					};
+
+					const load = (scan = false) => refresh(scan).catch((error) => {
+						console.error("Catalog request failed:", error);
+						listEl.textContent = `Catalog request failed: ${error}`;
+					});
+
+					let debounce = null;
+					filterEl.addEventListener("input", () => {
+						clearTimeout(debounce);
+						debounce = setTimeout(() => load(), 200);
+					});
+
+					const closeButton = document.createElement("button");
+					closeButton.textContent = "Close";
+					closeButton.style.marginTop = "6px";
+					closeButton.addEventListener("click", close);
+
+					dialog.append(filterEl, listEl, closeButton);
+					document.body.appendChild(dialog);
+					filterEl.focus();
+					load(true);
+				};
+
+				this.addWidget("button", "browse_latents", "Browse Latents", showCatalog);
+
 				// Drag and drop event handling
 				this.onDragOver = function(e) {
 					// Check if dragged items are files
@@ -3,158 +3,55 @@
 包含图片加载和workflow解析功能
 """
 
-import json
+import asyncio
 import os
 import re
-from PIL import Image
-from PIL.ExifTags import TAGS
+import time
 from PIL.PngImagePlugin import PngInfo
-import numpy as np
 import torch
 import folder_paths
 
+from ..utils.fingerprint import file_fingerprint, text_fingerprint
+from ..utils.image_batch import IMAGE_EXTENSIONS, RESIZE_METHODS, decode_images, read_image_size
+from ..utils.image_helpers import array_to_tensor, copy_pixels
+from ..utils.image_ingest import ImageIngestResult, ingest_image
+from ..utils.input_files import SORT_ORDERS, match_input_files, sort_paths, window_paths
+from ..utils.json_backend import JSONDecodeError
+from ..utils.tensor_cache import IMAGE_CACHE, file_key
+from ..utils.workflow_index import WorkflowMetadataIndex
+from ..utils.workflow_parser import WorkflowParser
 
-class WorkflowParser:
-    """
-    一个可重用的工作流解析器，用于提取提示词和模型信息。
-    """
-    # def is_negative_prompt(self, text):
-    #     """
-    #     判断文本是否为negative prompt
-    #     """
-    #     text_lower = text.lower()
-        
-    #     # 首先检查明确的positive关键词
-    #     positive_keywords = ["masterpiece", "best quality", "best"]
-    #     for keyword in positive_keywords:
-    #         if keyword in text_lower:
-    #             return False  # 明确是positive
-        
-    #     # 然后检查明确的negative关键词
-    #     negative_keywords = ["worst", "bad"]
-    #     for keyword in negative_keywords:
-    #         if keyword in text_lower:
-    #             return True   # 明确是negative
-        
-    #     # 如果没有明确关键词，使用其他特征判断
-    #     # 以lora标签开头通常是positive
-    #     if text.strip().startswith("<lora:"):
-    #         return False
-        
-    #     # 包含更多negative特征词汇
-    #     extended_negative_keywords = [
-    #         "low quality", "normal quality", "bad anatomy", "bad hands", 
-    #         "watermark", "signature", "simple background", "transparent"
-    #     ]
-    #     for keyword in extended_negative_keywords:
-    #         if keyword in text_lower:
-    #             return True
-        
-    #     # 默认判断为positive（保守策略）
-    #     return False
-
-    def parse_workflow_data(self, workflow_data):
-        """
-        解析workflow JSON，提取提示词和检查点名称
-        """
-        positive_prompt = ""
-        filtered_positive_prompt = ""
-        negative_prompt = ""
-        checkpoint_name = ""
-        
-        try:
-            nodes = workflow_data.get("nodes", [])
-
-            # 1. 新逻辑: 根据节点标题 "title" 查找正向提示词
-            for node in nodes:
-                title = node.get("title")
-                widgets_values = node.get("widgets_values")
-                properties = node.get("properties")
-
-                # 检查是否为 alekpet 节点
-                is_alekpet_node = False
-                if properties and isinstance(properties, dict):
-                    if properties.get("cnr_id") == "rgthree-comfy":
-                        is_alekpet_node = True
-
-                if is_alekpet_node:
-                    # rgthree-comfy 节点从 widgets_values[0] 获取提示词
-                    if widgets_values and isinstance(widgets_values, list) and len(widgets_values) > 0 and isinstance(widgets_values[0], str):
-                        if title == "positive_prompt":
-                            positive_prompt = widgets_values[0].strip()
-                        elif title == "filtered_positive_prompt":
-                            filtered_positive_prompt = widgets_values[0].strip()
-                        elif title == "negative_prompt":
-                            negative_prompt = widgets_values[0].strip()
-                else:
-                    # 原有逻辑，先尝试从 index 1 获取
-                    if widgets_values and isinstance(widgets_values, list) and len(widgets_values) > 1 and isinstance(widgets_values[1], str):
-                        if title == "positive_prompt":
-                            positive_prompt = widgets_values[1].strip()
-                        elif title == "filtered_positive_prompt":
-                            filtered_positive_prompt = widgets_values[1].strip()
-                        elif title == "negative_prompt":
-                            negative_prompt = widgets_values[1].strip()
-                    # 兼容逻辑：如果 index 1 失败，再尝试从 index 0 获取
-                    elif widgets_values and isinstance(widgets_values, list) and len(widgets_values) > 0 and isinstance(widgets_values[0], str):
-                        if title == "positive_prompt":
-                            positive_prompt = widgets_values[0].strip()
-                        elif title == "filtered_positive_prompt":
-                            filtered_positive_prompt = widgets_values[0].strip()
-                        elif title == "negative_prompt":
-                            negative_prompt = widgets_values[0].strip()
-            # # 2. 负向提示词提取逻辑 (基本不变)
-            # for node in nodes:
-            #     title = node.get("title")
-            #     widgets_values = node.get("widgets_values")
-            #     properties = node.get("properties")
-
-            #     # 检查是否为 alekpet 节点
-            #     is_alekpet_node = False
-            #     if properties and isinstance(properties, dict):
-            #         if properties.get("cnr_id") == "rgthree-comfy":
-            #             is_alekpet_node = True
 
-            #     if is_alekpet_node:
-            #         if title == "negative_prompt":
-            #             negative_prompt = widgets_values[0].strip()
-
-            
-            # negative_prompts_list = []
-            # for node in nodes:
-            #     # 负向提示词通常在没有特殊标题的 CLIPTextEncode 节点中
-            #     if node.get("type") == "CLIPTextEncode" and not node.get("title"):
-            #         widgets_values = node.get("widgets_values")
-            #         if widgets_values and isinstance(widgets_values, list) and len(widgets_values) > 0:
-            #             text_content = str(widgets_values[0])
-            #             if self.is_negative_prompt(text_content):
-            #                 negative_prompts_list.append(text_content.strip())
-            
-            # if negative_prompts_list:
-            #     negative_prompt = ", ".join(list(dict.fromkeys(negative_prompts_list)))
+# IMAGE输出精度选项
+IMAGE_PRECISIONS = {
+    "float32": torch.float32,
+    "float16": torch.float16,
+    "bfloat16": torch.bfloat16,
+}
 
-            # 3. 寻找CheckpointLoaderSimple节点 (逻辑不变)
-            for node in nodes:
-                # 优先使用更通用的 'type' 属性判断
-                if node.get("type") == "CheckpointLoaderSimple":
-                    widgets_values = node.get("widgets_values", [])
-                    if widgets_values and len(widgets_values) > 0 and isinstance(widgets_values[0], str):
-                        checkpoint_name = widgets_values[0]
-                        break # 找到第一个就停止
 
-                # 兼容旧的 'Node name for S&R' 属性
-                properties = node.get("properties", {})
-                node_name = properties.get("Node name for S&R", "")
-                if node_name == "CheckpointLoaderSimple":
-                    widgets_values = node.get("widgets_values", [])
-                    if widgets_values and len(widgets_values) > 0 and isinstance(widgets_values[0], str):
-                        checkpoint_name = widgets_values[0]
-                        break  # 找到第一个就停止
-            
-        except Exception as e:
-            print(f"解析workflow时出错: {e}")
-        
-        return positive_prompt, filtered_positive_prompt, negative_prompt, checkpoint_name
+def ingest_image_cached(image_path, decode_pixels=True, precision="float32", max_size=(0, 0), frames=None):
+    """
+    带缓存的 ingest_image：同一文件（路径+大小+修改时间未变）再次读取时直接返回缓存结果
+    返回的IMAGE tensor是缓存的副本，下游节点修改它不会影响缓存
+    缓存中只保存像素和原始JSON文本，不保存解析后的对象：解析结果由 PARSE_MEMO 按文本哈希缓存，
+    需要时才从文本解析，命中时也不必复制整个workflow字典
+    max_size为 (max_width, max_height)，0表示不限制；frames为 (start, count, stride)，None表示只读取第一帧
+    """
+    max_size = tuple(max_size)
+    frames = tuple(frames) if frames is not None else None
+    def load():
+        ingest = ingest_image(image_path, decode_pixels, IMAGE_PRECISIONS[precision], max_size if any(max_size) else None, frames)
+        return {
+            "image": ingest.image,
+            "workflow_text": ingest.workflow_text,
+            "source_key": ingest.source_key,
+            "prompt_text": ingest.prompt_text,
+        }
+    
+    pixel_options = (precision, max_size, frames) if decode_pixels else None
+    cached = IMAGE_CACHE.get_or_load(file_key(image_path, decode_pixels, pixel_options), load)
+    return ImageIngestResult(**cached)
 
 
 class WorkflowImageFileLoader:
@@ -172,7 +69,7 @@ class WorkflowImageFileLoader:
         files = []
         if os.path.exists(input_dir):
             for f in os.listdir(input_dir):
-                if f.lower().endswith(('.png', '.jpg', '.jpeg', '.webp', '.bmp')):
+                if f.lower().endswith(IMAGE_EXTENSIONS):
                     files.append(f)
         
         return {
@@ -185,15 +82,36 @@ class WorkflowImageFileLoader:
                     "default": "",
                     "placeholder": "Optional: Manually input workflow JSON if the image lacks workflow information."
                 }),
+                "precision": (list(IMAGE_PRECISIONS.keys()), {"default": "float32"}),
+                "max_width": ("INT", {"default": 0, "min": 0, "max": 16384, "tooltip": "Downscale the image to fit this width. JPEG decodes directly at the reduced size; PNG and WebP are decoded in full first, which is slower than not resizing. 0 keeps the full width."}),
+                "max_height": ("INT", {"default": 0, "min": 0, "max": 16384, "tooltip": "Downscale the image to fit this height. JPEG decodes directly at the reduced size; PNG and WebP are decoded in full first, which is slower than not resizing. 0 keeps the full height."}),
+                "frame_start": ("INT", {"default": 0, "min": 0, "max": 0xffffffff, "tooltip": "First frame of an animated GIF/WebP or page of a multi-page TIFF."}),
+                "frame_count": ("INT", {"default": 1, "min": 0, "max": 0xffffffff, "tooltip": "Number of frames to load as a batch. 0 loads every remaining frame."}),
+                "frame_stride": ("INT", {"default": 1, "min": 1, "max": 0xffffffff, "tooltip": "Load every n-th frame."}),
             }
         }
     
+    # 只影响像素解码的可选输入，元数据加载节点不需要
+    PIXEL_INPUTS = ("precision", "max_width", "max_height", "frame_start", "frame_count", "frame_stride")
+    
     RETURN_TYPES = ("IMAGE", "STRING", "STRING", "STRING", "STRING", "STRING", "STRING")
     RETURN_NAMES = ("image", "positive_prompt", "filtered_positive_prompt", "negative_prompt", "checkpoint_name", "workflow_info", "workflow_json_out")
     FUNCTION = "load_and_parse"
     CATEGORY = "only/Image"
+
+    @classmethod
+    def IS_CHANGED(cls, image_file, **kwargs):
+        """
+        上传会原地覆盖文件，因此用文件指纹判断图片是否变化
+        """
+        image_path = os.path.join(folder_paths.get_input_directory(), image_file)
+        try:
+            return file_fingerprint(image_path)
+        except OSError:
+            return float("NaN")  # 文件不存在时总是重新执行
     
-    def load_and_parse(self, image_file, workflow_json=""):
+    def load_and_parse(self, image_file, workflow_json="", precision="float32", max_width=0, max_height=0,
+                       frame_start=0, frame_count=1, frame_stride=1):
         """
         加载图片文件并解析workflow信息
         """
@@ -201,24 +119,27 @@ class WorkflowImageFileLoader:
         input_dir = folder_paths.get_input_directory()
         image_path = os.path.join(input_dir, image_file)
         
-        # 加载图片并转换为tensor
-        try:
-            with Image.open(image_path) as img:
-                # 转换为RGB
-                if img.mode != 'RGB':
-                    img = img.convert('RGB')
-                
-                # 转换为numpy数组并归一化
-                img_array = np.array(img).astype(np.float32) / 255.0
-                
-                # 转换为ComfyUI的IMAGE格式 [H, W, C]
-                output_image = torch.from_numpy(img_array).unsqueeze(0)
+        # 默认只读取第一帧，与单帧图片的行为一致
+        frames = None
+        if (frame_start, frame_count, frame_stride) != (0, 1, 1):
+            frames = (frame_start, frame_count, frame_stride)
         
+        # 只打开一次图片：同时读取元数据并解码像素（设置了最大尺寸时缩小，JPEG直接以较低分辨率解码）
+        try:
+            ingest = ingest_image_cached(image_path, precision=precision, max_size=(max_width, max_height), frames=frames)
+            output_image = ingest.image
         except Exception as e:
             # 如果图片加载失败，创建一个黑色图片
             output_image = torch.zeros(1, 512, 512, 3)
             return (output_image, "", "", "", "", "", "")
         
+        return (output_image,) + self.parse_ingested_workflow(ingest, workflow_json)
+    
+    def parse_ingested_workflow(self, ingest, workflow_json=""):
+        """
+        从读取结果（或手动输入的JSON）中解析workflow
+        返回 (positive_prompt, filtered_positive_prompt, negative_prompt, checkpoint_name, workflow_info, raw_workflow_text)
+        """
         # 初始化输出
         positive_prompt = ""
         negative_prompt = ""
@@ -228,31 +149,36 @@ class WorkflowImageFileLoader:
         filtered_positive_prompt = ""
         
         try:
-            workflow_data = None
+            manual = bool(workflow_json.strip())
             
             # 如果手动提供了workflow JSON，优先使用
-            if workflow_json.strip():
+            if manual:
                 raw_workflow_text = workflow_json
                 workflow_info = "使用手动输入的workflow"
             else:
-                # 否则，尝试从图片中提取
-                raw_workflow_text = self.extract_workflow_from_image(image_path)
+                # 否则，使用读取图片时已提取的workflow
+                raw_workflow_text = ingest.workflow_text or ""
                 if raw_workflow_text:
                     workflow_info = "从图片中提取的workflow"
                 else:
                     workflow_info = "图片中未找到workflow信息"
             
-            # 如果获取到了任何形式的workflow文本，尝试解析
-            if raw_workflow_text:
+            # 解析workflow数据，相同内容的解析结果会被缓存
+            results = None
+            if manual:
+                # 手动输入的workflow文本需要解析
                 try:
-                    workflow_data = json.loads(raw_workflow_text)
-                except json.JSONDecodeError as e:
+                    results = self.parser.parse_workflow_text(raw_workflow_text)
+                except JSONDecodeError as e:
                     workflow_info += f" - JSON格式错误: {str(e)}"
-                    workflow_data = None #确保数据无效
+            elif raw_workflow_text or ingest.prompt_text:
+                # 图片中有API格式的prompt时优先解析它，缺少的字段再从UI格式的workflow补充
+                # 缓存的读取结果只有文本，未命中解析缓存时才解析JSON
+                results = self.parser.parse_image_workflows_cached(
+                    ingest.prompt_text, ingest.prompt_data, raw_workflow_text, ingest.workflow_data)
             
-            # 解析workflow数据
-            if workflow_data:
-                positive_prompt, filtered_positive_prompt, negative_prompt, checkpoint_name = self.parser.parse_workflow_data(workflow_data)
+            if results is not None:
+                positive_prompt, filtered_positive_prompt, negative_prompt, checkpoint_name = results
                 if positive_prompt or negative_prompt or checkpoint_name:
                     workflow_info += f" - 解析成功: Positive({len(positive_prompt)}字符), Negative({len(negative_prompt)}字符), Checkpoint({checkpoint_name})"
                 else:
@@ -261,57 +187,169 @@ class WorkflowImageFileLoader:
         except Exception as e:
             workflow_info = f"解析错误: {str(e)}"
         
-        return (output_image, positive_prompt, filtered_positive_prompt, negative_prompt, checkpoint_name, workflow_info, raw_workflow_text)
+        return (positive_prompt, filtered_positive_prompt, negative_prompt, checkpoint_name, workflow_info, raw_workflow_text)
     
-    def extract_workflow_from_image(self, image_path):
+    def extract_workflow_from_image(self, image_path, with_data=False):
         """
         从图片文件中提取原始的workflow JSON字符串
+        with_data为True时返回 (原始字符串, 解析后的对象)，提取时已经解析过，调用方不需要再解析一次
         """
         try:
-            with Image.open(image_path) as img:
-                # 检查PNG文本信息
-                if hasattr(img, 'text') and img.text:
-                    # 查找workflow相关的键
-                    workflow_keys = ['workflow', 'Workflow', 'ComfyUI_workflow', 'prompt', 'parameters']
-                    for key in workflow_keys:
-                        if key in img.text:
-                            workflow_text = img.text[key]
-                            try:
-                                # 验证它是否是有效的JSON，但返回原始字符串
-                                json.loads(workflow_text)
-                                return workflow_text
-                            except json.JSONDecodeError:
-                                continue
-                
-                # 检查PNG info参数
-                if hasattr(img, 'info') and img.info:
-                    for key, value in img.info.items():
-                        if 'workflow' in key.lower() or 'comfy' in key.lower():
-                            if isinstance(value, str):
-                                try:
-                                    # 验证它是否是有效的JSON，但返回原始字符串
-                                    json.loads(value)
-                                    return value
-                                except (json.JSONDecodeError, TypeError):
-                                    continue
-                
-                # 检查EXIF数据（主要用于JPEG）
-                if hasattr(img, '_getexif') and img._getexif():
-                    exif_data = img._getexif()
-                    for tag_id, value in exif_data.items():
-                        tag = TAGS.get(tag_id, tag_id)
-                        if isinstance(value, str) and ('workflow' in value.lower() or 'comfy' in value.lower()):
-                            try:
-                                # 验证它是否是有效的JSON，但返回原始字符串
-                                json.loads(value)
-                                return value
-                            except (json.JSONDecodeError, TypeError):
-                                continue
-        
+            ingest = ingest_image(image_path, decode_pixels=False)
+            return (ingest.workflow_text, ingest.workflow_data) if with_data else ingest.workflow_text
         except Exception as e:
             print(f"提取workflow时出错: {e}")
         
-        return None
+        return (None, None) if with_data else None
+    
+
+class WorkflowMetadataLoader(WorkflowImageFileLoader):
+    """
+    只读取图片元数据的workflow加载节点，不解码像素
+    适用于只需要提示词/checkpoint输出的场景
+    """
+    
+    @classmethod
+    def INPUT_TYPES(cls):
+        inputs = super().INPUT_TYPES()
+        for name in cls.PIXEL_INPUTS:
+            inputs["optional"].pop(name, None)
+        return inputs
+    
+    RETURN_TYPES = ("STRING", "STRING", "STRING", "STRING", "STRING", "STRING")
+    RETURN_NAMES = ("positive_prompt", "filtered_positive_prompt", "negative_prompt", "checkpoint_name", "workflow_info", "workflow_json_out")
+    FUNCTION = "load_metadata"
+    
+    def load_metadata(self, image_file, workflow_json=""):
+        """
+        读取图片元数据并解析workflow信息
+        """
+        input_dir = folder_paths.get_input_directory()
+        image_path = os.path.join(input_dir, image_file)
+        
+        try:
+            ingest = ingest_image_cached(image_path, decode_pixels=False)
+        except Exception as e:
+            return ("", "", "", "", f"读取图片失败: {str(e)}", "")
+        
+        return self.parse_ingested_workflow(ingest, workflow_json)
+    
+
+class WorkflowImageBatchLoader:
+    """
+    批量图片加载节点：读取输入目录下匹配的所有图片，并行解码（默认使用线程池）并组成一个IMAGE batch
+    同时输出每张图片解析出的提示词和checkpoint列表
+    """
+    SIZE_MODES = ["keep largest group", "resize to first", "resize to size", "error"]
+    
+    def __init__(self):
+        self.parser = WorkflowParser()
+    
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "path_pattern": ("STRING", {"default": "", "multiline": False, "tooltip": "Directory or glob pattern relative to the input directory, e.g. refs/**/*.png"}),
+                "sort_by": (SORT_ORDERS, {"default": "name"}),
+                "start": ("INT", {"default": 0, "min": 0, "max": 0xffffffff}),
+                "limit": ("INT", {"default": 0, "min": 0, "max": 0xffffffff, "tooltip": "Maximum number of images to load. 0 loads all of them."}),
+                "size_mode": (cls.SIZE_MODES, {"default": "keep largest group"}),
+                "width": ("INT", {"default": 1024, "min": 1, "max": 16384, "tooltip": "Target width for 'resize to size'."}),
+                "height": ("INT", {"default": 1024, "min": 1, "max": 16384, "tooltip": "Target height for 'resize to size'."}),
+                "resize_method": (RESIZE_METHODS, {"default": "stretch"}),
+                "max_workers": ("INT", {"default": min(8, os.cpu_count() or 1), "min": 1, "max": 64}),
+            },
+            "optional": {
+                "precision": (list(IMAGE_PRECISIONS.keys()), {"default": "float32"}),
+                "use_processes": ("BOOLEAN", {"default": False, "tooltip": "Decode in a process pool instead of threads. Workers start as fresh interpreters (forkserver/spawn) and import PIL and torch again, which takes seconds; only worth it for large batches."}),
+            }
+        }
+    
+    RETURN_TYPES = ("IMAGE", "STRING", "STRING", "STRING", "STRING", "STRING", "STRING")
+    RETURN_NAMES = ("images", "positive_prompt", "filtered_positive_prompt", "negative_prompt", "checkpoint_name", "filename", "load_report")
+    OUTPUT_IS_LIST = (False, True, True, True, True, True, False)
+    FUNCTION = "load_batch"
+    CATEGORY = "only/Image"
+    
+    @classmethod
+    def IS_CHANGED(cls, path_pattern, sort_by, start, limit, **kwargs):
+        try:
+            image_paths = cls._list_images(path_pattern, sort_by, start, limit)
+            return text_fingerprint("\n".join(f"{path}:{file_fingerprint(path)}" for path in image_paths))
+        except Exception:
+            return float("NaN")
+    
+    @staticmethod
+    def _list_images(path_pattern, sort_by, start, limit):
+        input_dir = folder_paths.get_input_directory()
+        paths = match_input_files(input_dir, path_pattern, "*", IMAGE_EXTENSIONS)
+        return window_paths(sort_paths(paths, sort_by), start, limit)
+    
+    def load_batch(self, path_pattern, sort_by, start, limit, size_mode, width, height, resize_method, max_workers,
+                   precision="float32", use_processes=False):
+        """
+        并行解码匹配的图片并按尺寸分组，输出同一尺寸的图片batch
+        """
+        image_paths = self._list_images(path_pattern, sort_by, start, limit)
+        if not image_paths:
+            raise FileNotFoundError(f"没有匹配 '{path_pattern}' 的图片 (start={start}, limit={limit})")
+        
+        input_dir = os.path.abspath(folder_paths.get_input_directory())
+        names = [os.path.relpath(p, input_dir) for p in image_paths]
+        
+        # 需要统一尺寸时在子进程中直接缩放，传回主进程的数据量与输出尺寸一致
+        size = None
+        if size_mode == "resize to size":
+            size = (width, height)
+        elif size_mode == "resize to first":
+            size = read_image_size(image_paths[0])
+        
+        decoded = decode_images(image_paths, max_workers, size, resize_method, self.parser.parse_image_workflows, use_processes)
+        
+        # 按图片尺寸分组
+        groups = {}
+        failed = []
+        for index, item in enumerate(decoded):
+            if item.pixels is None:
+                failed.append(index)
+            else:
+                # 16位灰度图的像素数组是 [H, W]，按 (H, W, 3) 分组
+                groups.setdefault(item.pixels.shape[:2] + (3,), []).append(index)
+        if not groups:
+            raise ValueError(f"所有图片都无法解码，例如 {names[0]}: {decoded[0].error}")
+        
+        keep_shape = max(groups, key=lambda shape: len(groups[shape]))
+        if len(groups) > 1 and size_mode == "error":
+            raise ValueError("图片尺寸不一致:\n" + self._format_groups(groups, names))
+        kept = groups[keep_shape]
+        
+        # 预先分配输出，逐张写入并缩放到 [0, 1]（8位图片和16位图片的系数不同）
+        output = torch.empty((len(kept),) + keep_shape, dtype=IMAGE_PRECISIONS[precision])
+        for slot, index in enumerate(kept):
+            copy_pixels(output[slot], array_to_tensor(decoded[index].pixels))
+            output[slot].mul_(decoded[index].scale)
+            decoded[index].pixels = None
+        
+        parsed = [decoded[index].parsed or ("", "", "", "") for index in kept]
+        positive, filtered_positive, negative, checkpoint = (list(values) for values in zip(*parsed))
+        
+        report = f"加载了 {len(kept)} 张图片，尺寸 {keep_shape[1]}x{keep_shape[0]}，其中 {sum(1 for item in parsed if any(item))} 张包含workflow信息。"
+        if len(groups) > 1:
+            skipped = {shape: indices for shape, indices in groups.items() if shape != keep_shape}
+            report += f" 跳过了 {sum(len(indices) for indices in skipped.values())} 张尺寸不同的图片:\n" + self._format_groups(skipped, names)
+        if failed:
+            report += f"\n {len(failed)} 张图片解码失败: " + ", ".join(f"{names[i]} ({decoded[i].error})" for i in failed[:5])
+        
+        return (output, positive, filtered_positive, negative, checkpoint, [names[i] for i in kept], report)
+    
+    @staticmethod
+    def _format_groups(groups, names):
+        lines = []
+        for shape, indices in sorted(groups.items(), key=lambda item: -len(item[1])):
+            shown = ", ".join(names[i] for i in indices[:5])
+            more = f" 等 {len(indices)} 张" if len(indices) > 5 else ""
+            lines.append(f"  {shape[1]}x{shape[0]}: {len(indices)} 张 ({shown}{more})")
+        return "\n".join(lines)
     
 
 class WorkflowJSONParser:
@@ -338,6 +376,10 @@ class WorkflowJSONParser:
     RETURN_NAMES = ("positive_prompt", "filtered_positive_prompt", "negative_prompt", "checkpoint_name", "parse_info")
     FUNCTION = "parse_workflow"
     CATEGORY = "only/Text"
+
+    @classmethod
+    def IS_CHANGED(cls, workflow_json):
+        return text_fingerprint(workflow_json)
     
     def parse_workflow(self, workflow_json):
         """
@@ -354,11 +396,8 @@ class WorkflowJSONParser:
                 parse_info = "请输入workflow JSON"
                 return (positive_prompt, filtered_positive_prompt, negative_prompt, checkpoint_name, parse_info)
             
-            # 解析JSON
-            workflow_data = json.loads(workflow_json)
-            
-            # 使用共享的解析器
-            positive_prompt, filtered_positive_prompt, negative_prompt, checkpoint_name = self.parser.parse_workflow_data(workflow_data)
+            # 解析JSON并使用共享的解析器，相同的JSON文本直接返回缓存的结果
+            positive_prompt, filtered_positive_prompt, negative_prompt, checkpoint_name = self.parser.parse_workflow_text(workflow_json)
             
             # 生成解析信息
             prompt_count = len(positive_prompt.split(',')) if positive_prompt else 0
@@ -372,7 +411,7 @@ class WorkflowJSONParser:
             if checkpoint_name:
                 parse_info += f" Checkpoint: {checkpoint_name}。"
             
-        except json.JSONDecodeError as e:
+        except JSONDecodeError as e:
             parse_info = f"JSON 格式错误: {str(e)}"
             return (positive_prompt, filtered_positive_prompt, negative_prompt, checkpoint_name, parse_info)
         except Exception as e:
@@ -382,13 +421,75 @@ class WorkflowJSONParser:
         return (positive_prompt, filtered_positive_prompt, negative_prompt, checkpoint_name, parse_info)
     
 
+_workflow_index = None
+
+# 距上次刷新超过这么多秒时，查询会在后台刷新索引
+WORKFLOW_INDEX_STALE_SECONDS = 60
+
+
+def get_workflow_index():
+    """
+    返回输入/输出目录图片的共享元数据索引，保存在ComfyUI用户目录中
+    """
+    global _workflow_index
+    if _workflow_index is None:
+        user_dir = getattr(folder_paths, "get_user_directory", folder_paths.get_temp_directory)()
+        db_path = os.path.join(user_dir, "latent_input", "workflow_index.sqlite3")
+        _workflow_index = WorkflowMetadataIndex(db_path, {
+            "input": folder_paths.get_input_directory(),
+            "output": folder_paths.get_output_directory(),
+        })
+    return _workflow_index
+
+
+try:
+    from server import PromptServer
+    from aiohttp import web
+except ImportError:
+    PromptServer = None
+
+if PromptServer is not None and getattr(PromptServer, "instance", None) is not None:
+    _workflow_index_refresh = None
+
+    @PromptServer.instance.routes.get("/latent_input/workflow_search")
+    async def workflow_search_route(request):
+        """
+        全文搜索输入/输出目录图片的提示词、checkpoint和节点类型
+        参数: q（FTS5查询）, checkpoint, root（input / output）, limit, refresh=1（等待索引刷新完成后再查询）
+        """
+        global _workflow_index_refresh
+        loop = asyncio.get_running_loop()
+        index = await loop.run_in_executor(None, get_workflow_index)
+        try:
+            limit = int(request.query.get("limit", 100))
+        except ValueError:
+            limit = 100
+        # 读取图片元数据是阻塞的文件I/O，放到线程池中执行；索引过期时先返回现有结果，后台刷新
+        if _workflow_index_refresh is None or _workflow_index_refresh.done():
+            if request.query.get("refresh") == "1" or time.time() - index.last_refresh > WORKFLOW_INDEX_STALE_SECONDS:
+                _workflow_index_refresh = loop.run_in_executor(None, index.refresh)
+        refreshing = _workflow_index_refresh is not None and not _workflow_index_refresh.done()
+        if refreshing and request.query.get("refresh") == "1":
+            await asyncio.shield(_workflow_index_refresh)
+            refreshing = False
+        images = await loop.run_in_executor(None, lambda: index.search(
+            request.query.get("q", ""), limit, request.query.get("checkpoint") or None, request.query.get("root") or None))
+        for record in images:
+            record["image_file"] = f"{record['root']}/{record['path']}"
+        return web.json_response({"images": images, "refreshing": refreshing})
+
+
 # 导出节点类
 NODE_CLASS_MAPPINGS = {
     "WorkflowImageFileLoader": WorkflowImageFileLoader,
+    "WorkflowMetadataLoader": WorkflowMetadataLoader,
+    "WorkflowImageBatchLoader": WorkflowImageBatchLoader,
     "WorkflowJSONParser": WorkflowJSONParser,
 }
 
 NODE_DISPLAY_NAME_MAPPINGS = {
     "WorkflowImageFileLoader": "Workflow Image Loader (File)",
+    "WorkflowMetadataLoader": "Workflow Metadata Loader",
+    "WorkflowImageBatchLoader": "Workflow Image Batch Loader (Directory)",
     "WorkflowJSONParser": "Workflow JSON Parser",
 } 
\ No newline at end of file
@@ -2,8 +2,121 @@
 
 import torch
 import os
+import json
+import math
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
 import folder_paths
-import safetensors.torch
+
+from ..utils.fingerprint import file_fingerprint, text_fingerprint
+from ..utils.input_files import SORT_ORDERS, match_input_files, sort_paths, window_paths
+from ..utils.latent_catalog import LatentCatalog
+from ..utils.latent_container import PRECISIONS, available_codecs, save_latent_container
+from ..utils.latent_io import LatentRegionError, describe_latent_tensor, load_latent_tensor, make_region_selector
+from ..utils.latent_prefetch import LatentPrefetcher, advise_page_cache, prefetch_enabled
+from ..utils.tensor_cache import IMAGE_CACHE, LATENT_CACHE, env_megabytes, file_key
+from ..utils.workflow_parser import PARSE_MEMO
+
+# Optional LatentLoaderAdvanced inputs that select a batch/frame window, in load_latent_samples' region order
+REGION_INPUTS = ("batch_start", "batch_count", "frame_start", "frame_count")
+
+def resolve_latent_path(latent_file):
+    """
+    Resolve a `latent_file` widget value ("input/<subfolder>/<name>" or an annotated filepath) to an absolute path.
+    """
+    if latent_file.startswith("input/"):
+        filename = latent_file[len("input/"):]
+        # construct full path of the "input" file
+        input_dir = folder_paths.get_input_directory()
+        latent_path = os.path.abspath(os.path.join(input_dir, filename))
+        # Security check: ensure the final path is within the input directory to prevent directory traversal attacks
+        if not latent_path.startswith(os.path.abspath(input_dir)):
+            raise FileNotFoundError(f"Invalid path specified: {latent_file}")
+    else:
+        latent_path = folder_paths.get_annotated_filepath(latent_file)
+
+    if not latent_path or not os.path.exists(latent_path):
+        raise FileNotFoundError(f"File not found at path: {latent_path}.")
+    return latent_path
+
+
+def read_latent_samples(latent_path, latent_file, select=None):
+    """
+    Decode a latent file and normalize its tensor to 4D/5D. `latent_file` is only used in error messages.
+    `select` optionally restricts the read to a batch/frame region (see utils.latent_io.make_region_selector).
+    """
+    try:
+        samples = load_latent_tensor(latent_path, select)
+    except LatentRegionError:
+        raise
+    except Exception as e:
+        raise RuntimeError(f"Failed to load file '{latent_file}'. It's not a valid safetensors or PyTorch file. Error: {e}")
+    
+    if samples is not None:
+        if samples.numel() == 0:
+            raise ValueError(f"The loaded latent file '{latent_file}' is empty or contains an empty tensor.")
+
+        if samples.ndim == 3:
+            samples = samples.unsqueeze(0)
+        
+        if samples.ndim not in [4, 5]:
+            raise ValueError(f"Loaded latent tensor from '{latent_file}' has an unsupported shape: {samples.shape}. Expected a 3D, 4D or 5D tensor.")
+
+        return samples
+    else:
+        raise ValueError(f"Could not extract a valid latent tensor from '{latent_file}'. The format may not be recognized.")
+
+
+def describe_latent_samples(latent_path, latent_file):
+    """
+    Return (shape, dtype, samples) for a latent file, with the shape normalized like `read_latent_samples`.
+    Formats with a header-only description are not read and `samples` is None; other files (PyTorch archives)
+    are read in full and `samples` holds the tensor. Files that fail to describe are read as well, so the
+    error is the one `read_latent_samples` reports.
+    """
+    try:
+        described = describe_latent_tensor(latent_path)
+    except Exception:
+        described = None
+    if described is not None:
+        shape, dtype = described
+        if len(shape) == 3:
+            shape = (1,) + tuple(shape)
+        if len(shape) in (4, 5) and math.prod(shape) > 0:
+            return tuple(shape), dtype, None
+    samples = read_latent_samples(latent_path, latent_file)
+    return tuple(samples.shape), samples.dtype, samples
+
+
+def _latent_cache_entry(latent_path, region):
+    select = make_region_selector(*region) if region else None
+    return file_key(latent_path, tuple(region) if select else None), select
+
+
+def load_latent_samples(latent_path, latent_file, region=None):
+    """
+    Same as `read_latent_samples`, but repeated loads of an unchanged file are served from the process-wide cache.
+    `region` is an optional (batch_start, batch_count, frame_start, frame_count) window.
+    """
+    key, select = _latent_cache_entry(latent_path, region)
+    return LATENT_CACHE.get_or_load(key, lambda: read_latent_samples(latent_path, latent_file, select))
+
+
+def warm_latent_cache(latent_path, latent_file, inputs):
+    """
+    Read a latent into the cache ahead of execution, for the prefetcher. `inputs` are the node's queued inputs.
+    """
+    region = tuple(inputs.get(name, 0) for name in REGION_INPUTS)
+    if not all(isinstance(value, int) for value in region):
+        return  # a linked region input is only known at execution time
+    if LATENT_CACHE.max_bytes == 0:
+        advise_page_cache(latent_path)
+        return
+    key, select = _latent_cache_entry(latent_path, region)
+    if key not in LATENT_CACHE:
+        LATENT_CACHE.put(key, read_latent_samples(latent_path, latent_file, select))
+
 
 class LatentLoaderAdvanced:
     """
@@ -15,71 +128,282 @@ class LatentLoaderAdvanced:
             "required": {
                 "latent_file": ("STRING", {"default": "", "multiline": False}),
             },
+            "optional": {
+                "batch_start": ("INT", {"default": 0, "min": 0, "max": 0xffffffff}),
+                "batch_count": ("INT", {"default": 0, "min": 0, "max": 0xffffffff, "tooltip": "Number of batch items to read. 0 reads to the end."}),
+                "frame_start": ("INT", {"default": 0, "min": 0, "max": 0xffffffff, "tooltip": "First frame to read from a 5D video latent. Must be 0 for image latents."}),
+                "frame_count": ("INT", {"default": 0, "min": 0, "max": 0xffffffff, "tooltip": "Number of frames to read from a 5D video latent. 0 reads to the end; must be 0 for image latents."}),
+            },
         }
 
     RETURN_TYPES = ("LATENT",)
     FUNCTION = "load_latent"
     CATEGORY = "latent"
+
+    @classmethod
+    def IS_CHANGED(cls, latent_file, **kwargs):
+        # Uploads overwrite files in place, so the file itself has to be part of the cache key
+        try:
+            return file_fingerprint(resolve_latent_path(latent_file))
+        except Exception:
+            return float("NaN")  # always re-run, load_latent reports the actual error
     
-    def load_latent(self, latent_file):
-        if latent_file.startswith("input/"):
-            filename = latent_file[len("input/"):]
-            # construct full path of the "input" file
-            input_dir = folder_paths.get_input_directory()
-            latent_path = os.path.abspath(os.path.join(input_dir, filename))
-            # Security check: ensure the final path is within the input directory to prevent directory traversal attacks
-            if not latent_path.startswith(os.path.abspath(input_dir)):
-                raise FileNotFoundError(f"Invalid path specified: {latent_file}")
-        else:
-            latent_path = folder_paths.get_annotated_filepath(latent_file)
-        
-        if not latent_path or not os.path.exists(latent_path):
-            raise FileNotFoundError(f"File not found at path: {latent_path}.")
+    def load_latent(self, latent_file, batch_start=0, batch_count=0, frame_start=0, frame_count=0):
+        latent_path = resolve_latent_path(latent_file)
+        # Safetensors files only read the requested window from disk
+        region = (batch_start, batch_count, frame_start, frame_count)
+        samples = load_latent_samples(latent_path, latent_file, region)
+        return ({"samples": samples},)
 
-        latent_data = None
+
+class LatentBatchLoader:
+    """
+    Loads every latent file matched by a directory or glob pattern under the input directory and stacks them into one batch.
+    """
+    SORT_ORDERS = SORT_ORDERS
+    SHAPE_MISMATCH_MODES = ["error", "keep largest group", "keep first shape"]
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "path_pattern": ("STRING", {"default": "latents/*.latent", "multiline": False}),
+                "sort_by": (cls.SORT_ORDERS, {"default": "name"}),
+                "start": ("INT", {"default": 0, "min": 0, "max": 0xffffffff}),
+                "limit": ("INT", {"default": 0, "min": 0, "max": 0xffffffff, "tooltip": "Maximum number of files to load. 0 loads all of them."}),
+                "on_shape_mismatch": (cls.SHAPE_MISMATCH_MODES, {"default": "error"}),
+                "max_workers": ("INT", {"default": 4, "min": 1, "max": 64}),
+            },
+        }
+
+    RETURN_TYPES = ("LATENT", "STRING")
+    RETURN_NAMES = ("latent", "load_report")
+    FUNCTION = "load_batch"
+    CATEGORY = "latent"
+
+    @classmethod
+    def IS_CHANGED(cls, path_pattern, sort_by, start, limit, **kwargs):
         try:
-            latent_data = safetensors.torch.load_file(latent_path, device="cpu")
+            latent_paths = cls._window(cls._sorted(cls._match_files(path_pattern), sort_by), start, limit)
+            return text_fingerprint("\n".join(f"{path}:{file_fingerprint(path)}" for path in latent_paths))
         except Exception:
-            try:
-                latent_data = torch.load(latent_path, map_location="cpu", weights_only=False)
-            except Exception as e:
-                raise RuntimeError(f"Failed to load file '{latent_file}'. It's not a valid safetensors or PyTorch file. Error: {e}")
-        
-        samples = None
-        if isinstance(latent_data, dict):
-            if 'samples' in latent_data and torch.is_tensor(latent_data['samples']):
-                samples = latent_data['samples']
-            elif 'latent_tensor' in latent_data and torch.is_tensor(latent_data['latent_tensor']):
-                samples = latent_data['latent_tensor']
-            else:
-                for key, value in latent_data.items():
-                    if torch.is_tensor(value) and value.numel() > 0:
-                        samples = value
-                        break
-        elif torch.is_tensor(latent_data):
-            samples = latent_data
-        
-        if samples is not None:
-            if samples.numel() == 0:
-                raise ValueError(f"The loaded latent file '{latent_file}' is empty or contains an empty tensor.")
+            return float("NaN")
+
+    def load_batch(self, path_pattern, sort_by, start, limit, on_shape_mismatch, max_workers):
+        latent_paths = self._window(self._sorted(self._match_files(path_pattern), sort_by), start, limit)
+        if not latent_paths:
+            raise FileNotFoundError(f"No latent files matched '{path_pattern}' (start={start}, limit={limit}).")
 
-            if samples.ndim == 3:
-                samples = samples.unsqueeze(0)
-            
-            if samples.ndim not in [4, 5]:
-                raise ValueError(f"Loaded latent tensor from '{latent_file}' has an unsupported shape: {samples.shape}. Expected a 3D, 4D or 5D tensor.")
+        input_dir = os.path.abspath(folder_paths.get_input_directory())
+        names = [os.path.relpath(p, input_dir) for p in latent_paths]
 
-            return ({"samples": samples},)
+        # Decoding releases the GIL for the actual reads, so a small thread pool overlaps the I/O
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(latent_paths))) as pool:
+            # Shapes come from the headers where the format allows it, so the output can be sized before any data is read
+            described = list(pool.map(describe_latent_samples, latent_paths, names))
+            return self._assemble_batch(pool, latent_paths, names, described, on_shape_mismatch)
+
+    def _assemble_batch(self, pool, latent_paths, names, described, on_shape_mismatch):
+        # Group files by per-item shape (everything but the batch dimension)
+        groups = {}
+        for index, (shape, _, _) in enumerate(described):
+            groups.setdefault(shape[1:], []).append(index)
+
+        if len(groups) > 1:
+            if on_shape_mismatch == "error":
+                raise ValueError("Latent files have mismatched shapes:\n" + self._format_groups(groups, names))
+            if on_shape_mismatch == "keep largest group":
+                keep_shape = max(groups, key=lambda shape: len(groups[shape]))
+            else:
+                keep_shape = described[0][0][1:]
         else:
-            raise ValueError(f"Could not extract a valid latent tensor from '{latent_file}'. The format may not be recognized.")
+            keep_shape = next(iter(groups))
+        kept = groups[keep_shape]
+
+        # Files that were read to learn their shape and are not kept can go right away
+        kept_set = set(kept)
+        for i, (shape, dtype, samples) in enumerate(described):
+            if samples is not None and i not in kept_set:
+                described[i] = (shape, dtype, None)
+
+        # Preallocate the output once; every file is read without the latent cache and copied into its
+        # slice as soon as it arrives, so at most one file per worker is alive next to the output
+        offsets = []
+        total = 0
+        for i in kept:
+            offsets.append(total)
+            total += described[i][0][0]
+        output = torch.empty((total,) + keep_shape, dtype=described[kept[0]][1])
+
+        def fill(i, offset):
+            shape, _, samples = described[i]
+            described[i] = None
+            if samples is None:
+                samples = read_latent_samples(latent_paths[i], names[i])
+            if tuple(samples.shape) != shape:
+                raise ValueError(f"Latent file '{names[i]}' changed while the batch was loading: "
+                                 f"expected shape {list(shape)}, got {list(samples.shape)}.")
+            output[offset:offset + shape[0]].copy_(samples)
+
+        for _ in pool.map(fill, kept, offsets):
+            pass
+
+        report = f"Loaded {len(kept)} file(s), {total} item(s), item shape {list(keep_shape)}."
+        if len(kept) < len(latent_paths):
+            skipped = {shape: indices for shape, indices in groups.items() if shape != keep_shape}
+            report += f" Skipped {len(latent_paths) - len(kept)} file(s) with a different shape:\n" + self._format_groups(skipped, names)
+        return ({"samples": output}, report)
+
+    @staticmethod
+    def _match_files(path_pattern):
+        return match_input_files(folder_paths.get_input_directory(), path_pattern, "*.latent")
+
+    @staticmethod
+    def _sorted(paths, sort_by):
+        return sort_paths(paths, sort_by)
+
+    @staticmethod
+    def _window(paths, start, limit):
+        return window_paths(paths, start, limit)
+
+    @staticmethod
+    def _format_groups(groups, names):
+        lines = []
+        for shape, indices in sorted(groups.items(), key=lambda item: -len(item[1])):
+            shown = ", ".join(names[i] for i in indices[:5])
+            more = f" and {len(indices) - 5} more" if len(indices) > 5 else ""
+            lines.append(f"  {list(shape)}: {len(indices)} file(s) ({shown}{more})")
+        return "\n".join(lines)
+
+
+class LatentSaveCompressed:
+    """
+    Saves a latent as a compressed container (optionally down-cast to fp16/bf16) that LatentLoaderAdvanced can load back.
+    """
+    def __init__(self):
+        self.output_dir = folder_paths.get_output_directory()
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "samples": ("LATENT",),
+                "filename_prefix": ("STRING", {"default": "latents/ComfyUI"}),
+                "precision": (list(PRECISIONS.keys()), {"default": "float16"}),
+                "codec": (available_codecs(),),
+                "compression_level": ("INT", {"default": 3, "min": 1, "max": 19}),
+            },
+            "hidden": {"prompt": "PROMPT", "extra_pnginfo": "EXTRA_PNGINFO"},
+        }
+
+    RETURN_TYPES = ()
+    FUNCTION = "save"
+    OUTPUT_NODE = True
+    CATEGORY = "latent"
+
+    def save(self, samples, filename_prefix, precision, codec, compression_level, prompt=None, extra_pnginfo=None):
+        full_output_folder, filename, counter, subfolder, filename_prefix = folder_paths.get_save_image_path(filename_prefix, self.output_dir)
+
+        # Keep the generating workflow alongside the tensor, as the built-in SaveLatent does
+        metadata = {}
+        if prompt is not None:
+            metadata["prompt"] = json.dumps(prompt)
+        if extra_pnginfo is not None:
+            for key, value in extra_pnginfo.items():
+                metadata[key] = json.dumps(value)
+
+        file = f"{filename}_{counter:05}_.latent"
+        save_latent_container(
+            os.path.join(full_output_folder, file),
+            {"samples": samples["samples"]},
+            codec=codec,
+            level=compression_level,
+            dtype=PRECISIONS[precision],
+            metadata=metadata,
+        )
+        return {"ui": {"latents": [{"filename": file, "subfolder": subfolder, "type": "output"}]}}
+
+
+_latent_catalog = None
+
+# Catalog queries older than this rescan the input directory even without scan=1
+CATALOG_STALE_SECONDS = 60
+
+
+def get_latent_catalog():
+    """Return the shared catalog of the input directory, persisted in the ComfyUI user directory."""
+    global _latent_catalog
+    if _latent_catalog is None:
+        user_dir = getattr(folder_paths, "get_user_directory", folder_paths.get_temp_directory)()
+        index_path = os.path.join(user_dir, "latent_input", "latent_catalog.json")
+        _latent_catalog = LatentCatalog(folder_paths.get_input_directory(), index_path)
+    return _latent_catalog
+
+
+try:
+    from server import PromptServer
+    from aiohttp import web
+except ImportError:
+    PromptServer = None
+
+if PromptServer is not None and getattr(PromptServer, "instance", None) is not None:
+    @PromptServer.instance.routes.get("/latent_input/catalog")
+    async def latent_catalog_route(request):
+        """
+        List the latent files of the input directory with their keys, shapes and dtypes.
+        Query parameters: `q` filters by path/key/dtype/shape text, `limit` caps the number of entries,
+        `scan=1` re-walks the directory first. Without it the in-memory catalog answers, so filtering
+        as the user types never touches the disk; a catalog older than CATALOG_STALE_SECONDS is rescanned.
+        """
+        catalog = get_latent_catalog()
+        try:
+            limit = int(request.query.get("limit", 500))
+        except ValueError:
+            limit = 500
+        if request.query.get("scan") == "1" or time.time() - catalog.last_scan > CATALOG_STALE_SECONDS:
+            # Header reads are blocking file I/O, keep them off the event loop
+            await asyncio.get_running_loop().run_in_executor(None, catalog.scan)
+        files = catalog.query(request.query.get("q", ""), limit)
+        for record in files:
+            record["latent_file"] = "input/" + record["path"]
+        return web.json_response({"files": files})
+
+    @PromptServer.instance.routes.get("/latent_input/cache_stats")
+    async def cache_stats_route(request):
+        """Hit/miss/eviction counters and memory use of the latent and image caches and the workflow parse memo."""
+        return web.json_response({"caches": [LATENT_CACHE.stats(), IMAGE_CACHE.stats(), PARSE_MEMO.stats()]})
+
+    # Prefetch never fills the cache past this ceiling, leaving headroom for the job that is running
+    PREFETCH_MAX_BYTES = env_megabytes("LATENT_INPUT_PREFETCH_MB", LATENT_CACHE.max_bytes / (2 * 1024 * 1024))
+
+    def _queued_prompts():
+        prompt_queue = PromptServer.instance.prompt_queue
+        with prompt_queue.mutex:
+            items = list(prompt_queue.queue)
+        # Queue items are (number, prompt_id, prompt, extra_data, outputs_to_execute)
+        return [item[2] for item in items]
+
+    if prefetch_enabled():
+        latent_prefetcher = LatentPrefetcher(
+            _queued_prompts,
+            resolve_latent_path,
+            warm_latent_cache,
+            lambda nbytes: LATENT_CACHE.max_bytes == 0 or LATENT_CACHE.current_bytes + nbytes <= PREFETCH_MAX_BYTES,
+            max_workers=int(os.environ.get("LATENT_INPUT_PREFETCH_WORKERS", 1)),
+        )
+        latent_prefetcher.start()
 
 
 # Node mappings
 NODE_CLASS_MAPPINGS = {
     "LatentLoaderAdvanced": LatentLoaderAdvanced,
+    "LatentBatchLoader": LatentBatchLoader,
+    "LatentSaveCompressed": LatentSaveCompressed,
 }
 
 # Node display name mappings
 NODE_DISPLAY_NAME_MAPPINGS = {
     "LatentLoaderAdvanced": "Load Latent (Upload)",
+    "LatentBatchLoader": "Load Latent Batch (Directory)",
+    "LatentSaveCompressed": "Save Latent (Compressed)",
 }
@@ -0,0 +1,272 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Bulk extraction of prompts and checkpoints from ComfyUI images, without ComfyUI.
+
+    python scripts/extract_metadata.py /data/outputs -o metadata.jsonl
+    python scripts/extract_metadata.py /data/outputs -o metadata.jsonl --resume
+    python scripts/extract_metadata.py /data/outputs -o metadata_parquet --format parquet
+
+Directories are walked recursively and the images are read in a process pool,
+in chunks of --chunk-size files. Only the container metadata is read (no pixel
+decode), and the workflow is parsed with the same WorkflowParser the nodes use.
+Results are streamed to JSONL, or to a directory of Parquet part files when
+pyarrow is installed, so memory stays bounded regardless of the tree size.
+
+Every finished chunk is appended to a checkpoint file (default: <output>.checkpoint).
+--resume skips the files listed there and appends to the existing output. A chunk
+that was written but not yet checkpointed when the run was interrupted is
+extracted again, so after a crash a few records may appear twice.
+"""
+
+import argparse
+import importlib
+import importlib.util
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE_NAME = "comfyui_latentinput"
+
+FIELDS = ["path", "size", "mtime", "source_key", "positive_prompt", "filtered_positive_prompt",
+          "negative_prompt", "checkpoint_name", "error"]
+RAW_FIELDS = ["workflow_json", "prompt_json"]
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Package import without ComfyUI
+# ----------------------------------------------------------------------------------------------------------------------
+def submodule(name):
+    """
+    Import a package submodule without running the package's __init__, which loads the nodes and needs ComfyUI.
+    Only the utils modules are used here and none of them imports folder_paths.
+    """
+    if PACKAGE_NAME not in sys.modules:
+        spec = importlib.util.spec_from_file_location(
+            PACKAGE_NAME, os.path.join(ROOT, "__init__.py"), submodule_search_locations=[ROOT]
+        )
+        sys.modules[PACKAGE_NAME] = importlib.util.module_from_spec(spec)
+    return importlib.import_module(f"{PACKAGE_NAME}.{name}")
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Worker side
+# ----------------------------------------------------------------------------------------------------------------------
+_worker = {}
+
+
+def _init_worker(raw):
+    _worker["ingest_image"] = submodule("utils.image_ingest").ingest_image
+    _worker["parser"] = submodule("utils.workflow_parser").WorkflowParser()
+    _worker["raw"] = raw
+
+
+def extract_record(path):
+    """Read one image's metadata and return its output record."""
+    record = dict.fromkeys(FIELDS + (RAW_FIELDS if _worker["raw"] else []), "")
+    record.update(path=path, size=0, mtime=0.0)
+    try:
+        st = os.stat(path)
+        record["size"], record["mtime"] = st.st_size, st.st_mtime
+        ingest = _worker["ingest_image"](path, decode_pixels=False)
+        record["source_key"] = ingest.source_key or ""
+        if ingest.workflow_data is not None or ingest.prompt_data is not None:
+            (record["positive_prompt"], record["filtered_positive_prompt"], record["negative_prompt"],
+             record["checkpoint_name"]) = _worker["parser"].parse_image_workflows(ingest.prompt_data, ingest.workflow_data)
+        if _worker["raw"]:
+            record["workflow_json"] = ingest.workflow_text or ""
+            record["prompt_json"] = ingest.prompt_text or ""
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+    return record
+
+
+def extract_chunk(paths):
+    return [extract_record(path) for path in paths]
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Input walking and output writers
+# ----------------------------------------------------------------------------------------------------------------------
+def iter_images(roots, extensions):
+    """Yield image paths below `roots` in a stable (sorted) order, without building the full list."""
+    for root in roots:
+        if os.path.isfile(root):
+            yield os.path.abspath(root)
+            continue
+        stack = [os.path.abspath(root)]
+        while stack:
+            directory = stack.pop()
+            try:
+                entries = sorted(os.scandir(directory), key=lambda entry: entry.name)
+            except OSError as e:
+                print(f"Skipping {directory}: {e}", file=sys.stderr)
+                continue
+            subdirectories = []
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirectories.append(entry.path)
+                elif entry.name.lower().endswith(extensions):
+                    yield entry.path
+            stack.extend(reversed(subdirectories))
+
+
+def iter_chunks(paths, chunk_size):
+    chunk = []
+    for path in paths:
+        chunk.append(path)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class JsonlWriter:
+    buffered = 0
+
+    def __init__(self, path, append):
+        self.file = open(path, "a" if append else "w", encoding="utf-8")
+
+    def write(self, records):
+        for record in records:
+            self.file.write(json.dumps(record, ensure_ascii=False))
+            self.file.write("\n")
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetWriter:
+    """Writes buffered records as numbered part files into a directory; a resumed run continues the numbering."""
+    def __init__(self, directory, append, fields, rows_per_file=50000):
+        import pyarrow
+        self.pyarrow = pyarrow
+        self.directory = directory
+        self.fields = fields
+        self.rows_per_file = rows_per_file
+        self.buffer = []
+        os.makedirs(directory, exist_ok=True)
+        existing = sorted(name for name in os.listdir(directory) if name.startswith("part-") and name.endswith(".parquet"))
+        if existing and not append:
+            raise FileExistsError(f"{directory} already contains part files; use --resume or another output directory.")
+        self.next_part = int(existing[-1][5:10]) + 1 if existing else 0
+
+    @property
+    def buffered(self):
+        return len(self.buffer)
+
+    def write(self, records):
+        self.buffer.extend(records)
+        if len(self.buffer) >= self.rows_per_file:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        import pyarrow.parquet
+        columns = {field: [record[field] for record in self.buffer] for field in self.fields}
+        table = self.pyarrow.table(columns)
+        path = os.path.join(self.directory, f"part-{self.next_part:05d}.parquet")
+        pyarrow.parquet.write_table(table, path + ".tmp")
+        os.replace(path + ".tmp", path)
+        self.next_part += 1
+        self.buffer = []
+
+    def close(self):
+        self.flush()
+
+
+def read_checkpoint(path):
+    if not os.path.exists(path):
+        return set()
+    with open(path, "r", encoding="utf-8") as f:
+        return {line.rstrip("\n") for line in f if line.strip()}
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Main
+# ----------------------------------------------------------------------------------------------------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("roots", nargs="+", help="Image files or directories to scan recursively.")
+    parser.add_argument("-o", "--output", required=True, help="JSONL file, or directory of part files for --format parquet.")
+    parser.add_argument("--format", choices=["jsonl", "parquet"], default="jsonl")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes (1 runs in-process).")
+    parser.add_argument("--chunk-size", type=int, default=256, help="Files per task sent to a worker.")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <output>.checkpoint).")
+    parser.add_argument("--resume", action="store_true", help="Skip files listed in the checkpoint and append to the output.")
+    parser.add_argument("--raw", action="store_true", help="Also store the raw workflow and API prompt JSON.")
+    args = parser.parse_args(argv)
+
+    fields = FIELDS + (RAW_FIELDS if args.raw else [])
+    extensions = submodule("utils.image_ingest").IMAGE_EXTENSIONS
+    checkpoint_path = args.checkpoint or args.output.rstrip("/\\") + ".checkpoint"
+    done = read_checkpoint(checkpoint_path) if args.resume else set()
+    if not args.resume and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+    if args.format == "parquet":
+        try:
+            writer = ParquetWriter(args.output, args.resume, fields)
+        except ImportError:
+            parser.error("--format parquet requires pyarrow")
+    else:
+        writer = JsonlWriter(args.output, args.resume)
+
+    chunks = iter_chunks((path for path in iter_images(args.roots, extensions) if path not in done), max(1, args.chunk_size))
+    started = time.perf_counter()
+    processed = failed = 0
+
+    with open(checkpoint_path, "a", encoding="utf-8") as checkpoint:
+        # Records are checkpointed only once the writer has made them durable (Parquet buffers up to a part file)
+        pending = []
+
+        def checkpoint_pending():
+            nonlocal processed, failed
+            checkpoint.write("".join(record["path"] + "\n" for record in pending))
+            checkpoint.flush()
+            processed += len(pending)
+            failed += sum(1 for record in pending if record["error"])
+            pending.clear()
+            elapsed = time.perf_counter() - started
+            print(f"\r{processed} files, {failed} errors, {processed / max(elapsed, 1e-9):.0f} files/s", end="", file=sys.stderr)
+
+        def collect(records):
+            writer.write(records)
+            pending.extend(records)
+            if writer.buffered == 0:
+                checkpoint_pending()
+
+        try:
+            if args.workers <= 1:
+                _init_worker(args.raw)
+                for chunk in chunks:
+                    collect(extract_chunk(chunk))
+            else:
+                # At most two chunks per worker are in flight, so the path generator and results stay bounded
+                with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker, initargs=(args.raw,)) as pool:
+                    in_flight = set()
+                    for chunk in chunks:
+                        in_flight.add(pool.submit(extract_chunk, chunk))
+                        if len(in_flight) >= args.workers * 2:
+                            finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                            for future in finished:
+                                collect(future.result())
+                    for future in in_flight:
+                        collect(future.result())
+        finally:
+            writer.close()
+            if pending:
+                checkpoint_pending()
+
+    print(f"\nDone: {processed} files, {failed} errors, written to {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
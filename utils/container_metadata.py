@@ -0,0 +1,236 @@
+"""
+不解码像素的图片元数据读取器
+直接解析PNG/JPEG/WebP容器结构，只读取元数据所需的字节
+- PNG: tEXt/zTXt/iTXt/eXIf 块，默认读到第一个IDAT为止
+- JPEG: APP1(EXIF/XMP) 和 COM 段，读到SOS为止
+- WebP: RIFF中的 EXIF/XMP 块，跳过图像数据块
+"""
+
+import os
+import struct
+import zlib
+from dataclasses import dataclass, field
+from typing import Optional
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+JPEG_SOI = b"\xff\xd8"
+EXIF_HEADER = b"Exif\x00\x00"
+XMP_HEADER = b"http://ns.adobe.com/xap/1.0/\x00"
+
+# EXIF中Exif子IFD的指针标签，以及UserComment标签
+EXIF_SUB_IFD = 0x8769
+USER_COMMENT = 0x9286
+
+# 防止损坏文件导致过大的读取
+MAX_TEXT_CHUNK = 64 * 1024 * 1024
+
+
+@dataclass
+class ContainerMetadata:
+    """
+    从图片容器中读取到的元数据
+    """
+    format: Optional[str] = None                 # "png" / "jpeg" / "webp"，无法识别时为None
+    text: dict = field(default_factory=dict)     # PNG文本块 {key: text}
+    exif: dict = field(default_factory=dict)     # EXIF字符串标签 {tag_id: text}
+    xmp: Optional[str] = None
+    comments: list = field(default_factory=list)  # JPEG COM段
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# EXIF (TIFF结构)
+# ----------------------------------------------------------------------------------------------------------------------
+def _decode_text(data):
+    data = data.rstrip(b"\x00")
+    try:
+        return data.decode("utf-8")
+    except UnicodeDecodeError:
+        return data.decode("latin-1")
+
+
+def _decode_user_comment(data, big_endian):
+    # 前8字节为字符集标识
+    charset, payload = data[:8], data[8:]
+    if charset.startswith(b"UNICODE"):
+        return payload.decode("utf-16-be" if big_endian else "utf-16-le", "replace").rstrip("\x00")
+    return _decode_text(payload)
+
+
+def parse_exif(data):
+    """
+    解析TIFF格式的EXIF数据，返回IFD0和Exif子IFD中的字符串标签 {tag_id: text}
+    只处理ASCII类型和UserComment，其他类型的值不会被读取
+    """
+    if data.startswith(EXIF_HEADER):
+        data = data[len(EXIF_HEADER):]
+    if len(data) < 8 or data[:2] not in (b"II", b"MM"):
+        return {}
+    big_endian = data[:2] == b"MM"
+    order = ">" if big_endian else "<"
+    values = {}
+
+    def read_ifd(offset, follow_sub_ifd):
+        if offset <= 0 or offset + 2 > len(data):
+            return
+        (count,) = struct.unpack_from(order + "H", data, offset)
+        for index in range(count):
+            entry = offset + 2 + index * 12
+            if entry + 12 > len(data):
+                return
+            tag, value_type, value_count = struct.unpack_from(order + "HHI", data, entry)
+            if tag == EXIF_SUB_IFD and follow_sub_ifd:
+                (sub_offset,) = struct.unpack_from(order + "I", data, entry + 8)
+                read_ifd(sub_offset, False)
+                continue
+            # 类型2为ASCII，类型7为UNDEFINED（UserComment）
+            if value_type not in (2, 7) or (value_type == 7 and tag != USER_COMMENT):
+                continue
+            if value_count <= 4:
+                raw = data[entry + 8:entry + 8 + value_count]
+            else:
+                (value_offset,) = struct.unpack_from(order + "I", data, entry + 8)
+                raw = data[value_offset:value_offset + value_count]
+            values[tag] = _decode_user_comment(raw, big_endian) if value_type == 7 else _decode_text(raw)
+
+    (ifd0,) = struct.unpack_from(order + "I", data, 4)
+    read_ifd(ifd0, True)
+    return values
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# PNG
+# ----------------------------------------------------------------------------------------------------------------------
+def _parse_png_text(chunk_type, data):
+    if chunk_type == b"tEXt":
+        key, _, text = data.partition(b"\x00")
+        return key.decode("latin-1"), text.decode("latin-1")
+    if chunk_type == b"zTXt":
+        key, _, rest = data.partition(b"\x00")
+        # rest[0] 为压缩方法，目前只有zlib
+        return key.decode("latin-1"), zlib.decompress(rest[1:]).decode("latin-1")
+    # iTXt: key\0 压缩标志 压缩方法 语言\0 翻译后的key\0 文本
+    key, _, rest = data.partition(b"\x00")
+    compressed = rest[0:1] == b"\x01"
+    _, _, rest = rest[2:].partition(b"\x00")
+    _, _, text = rest.partition(b"\x00")
+    if compressed:
+        text = zlib.decompress(text)
+    return key.decode("latin-1"), text.decode("utf-8", "replace")
+
+
+def _read_png(f, metadata, stop_at_idat):
+    while True:
+        header = f.read(8)
+        if len(header) < 8:
+            return
+        length, chunk_type = struct.unpack(">I4s", header)
+        if chunk_type == b"IEND" or (chunk_type == b"IDAT" and stop_at_idat):
+            return
+        if chunk_type in (b"tEXt", b"zTXt", b"iTXt", b"eXIf") and length <= MAX_TEXT_CHUNK:
+            data = f.read(length)
+            f.seek(4, os.SEEK_CUR)  # CRC
+            try:
+                if chunk_type == b"eXIf":
+                    metadata.exif.update(parse_exif(data))
+                else:
+                    key, text = _parse_png_text(chunk_type, data)
+                    metadata.text.setdefault(key, text)
+            except (zlib.error, ValueError, IndexError, struct.error):
+                continue  # 跳过损坏的块
+        else:
+            f.seek(length + 4, os.SEEK_CUR)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# JPEG
+# ----------------------------------------------------------------------------------------------------------------------
+def _read_jpeg(f, metadata):
+    while True:
+        marker = f.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return
+        code = marker[1]
+        # 填充字节
+        while code == 0xFF:
+            next_byte = f.read(1)
+            if not next_byte:
+                return
+            code = next_byte[0]
+        # 没有长度字段的独立标记
+        if code in (0x01,) or 0xD0 <= code <= 0xD7:
+            continue
+        # SOS之后是压缩数据，EOI为结束
+        if code in (0xDA, 0xD9):
+            return
+        length_bytes = f.read(2)
+        if len(length_bytes) < 2:
+            return
+        (length,) = struct.unpack(">H", length_bytes)
+        size = length - 2
+        if code == 0xE1 or code == 0xFE:
+            data = f.read(size)
+            if code == 0xFE:
+                metadata.comments.append(_decode_text(data))
+            elif data.startswith(EXIF_HEADER):
+                try:
+                    metadata.exif.update(parse_exif(data))
+                except struct.error:
+                    pass
+            elif data.startswith(XMP_HEADER):
+                metadata.xmp = data[len(XMP_HEADER):].decode("utf-8", "replace")
+        else:
+            f.seek(size, os.SEEK_CUR)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# WebP
+# ----------------------------------------------------------------------------------------------------------------------
+def _read_webp(f, metadata):
+    while True:
+        header = f.read(8)
+        if len(header) < 8:
+            return
+        fourcc, size = struct.unpack("<4sI", header)
+        padded = size + (size & 1)
+        if fourcc == b"EXIF" and size <= MAX_TEXT_CHUNK:
+            data = f.read(size)
+            try:
+                metadata.exif.update(parse_exif(data))
+            except struct.error:
+                pass
+            f.seek(padded - size, os.SEEK_CUR)
+        elif fourcc == b"XMP " and size <= MAX_TEXT_CHUNK:
+            metadata.xmp = f.read(size).decode("utf-8", "replace")
+            f.seek(padded - size, os.SEEK_CUR)
+        else:
+            f.seek(padded, os.SEEK_CUR)
+
+
+def read_container_metadata(f, stop_at_idat=True):
+    """
+    从已打开的二进制文件对象读取元数据，读取前会定位到文件开头
+    `stop_at_idat` 为True时PNG只读取第一个IDAT之前的块（ComfyUI写入的元数据都在IDAT之前）
+    """
+    f.seek(0)
+    head = f.read(12)
+    metadata = ContainerMetadata()
+    if head.startswith(PNG_SIGNATURE):
+        metadata.format = "png"
+        f.seek(len(PNG_SIGNATURE))
+        _read_png(f, metadata, stop_at_idat)
+    elif head.startswith(JPEG_SOI):
+        metadata.format = "jpeg"
+        f.seek(len(JPEG_SOI))
+        _read_jpeg(f, metadata)
+    elif head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        metadata.format = "webp"
+        _read_webp(f, metadata)
+    return metadata
+
+
+def read_image_metadata(image_path, stop_at_idat=True):
+    """
+    读取图片文件的元数据，不解码像素
+    """
+    with open(image_path, "rb") as f:
+        return read_container_metadata(f, stop_at_idat)
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+Cheap fingerprints of input files and strings, used by the nodes' IS_CHANGED.
+
+The default fingerprint is the file's stat signature (size, mtime_ns, inode),
+which costs one stat call. Setting LATENT_INPUT_CONTENT_HASH=1 adds a fast
+content hash over the header, a few evenly spaced blocks and the tail of the
+file; it is memoized per (path, size, mtime_ns) so unchanged files are hashed once.
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+SAMPLE_BLOCK_SIZE = 64 * 1024
+SAMPLE_BLOCKS = 8
+_MEMO_MAX_ENTRIES = 4096
+
+_memo = OrderedDict()
+_memo_lock = threading.Lock()
+
+
+def content_hash_enabled():
+    return os.environ.get("LATENT_INPUT_CONTENT_HASH", "").strip().lower() in ("1", "true", "yes", "on")
+
+
+def _new_hasher():
+    if xxhash is not None:
+        return xxhash.xxh3_128()
+    return hashlib.blake2b(digest_size=16)
+
+
+def stat_signature(path):
+    """Return (real_path, size, mtime_ns, inode) for `path`."""
+    real_path = os.path.realpath(path)
+    st = os.stat(real_path)
+    return real_path, st.st_size, st.st_mtime_ns, st.st_ino
+
+
+def sampled_content_hash(path, size=None):
+    """
+    Hash the first block, SAMPLE_BLOCKS evenly spaced blocks and the last block of the file.
+    Files smaller than the sampled span are hashed in full.
+    """
+    if size is None:
+        size = os.path.getsize(path)
+    hasher = _new_hasher()
+    hasher.update(size.to_bytes(8, "little"))
+    with open(path, "rb") as f:
+        if size <= SAMPLE_BLOCK_SIZE * (SAMPLE_BLOCKS + 2):
+            hasher.update(f.read())
+        else:
+            step = (size - SAMPLE_BLOCK_SIZE) // (SAMPLE_BLOCKS + 1)
+            for index in range(SAMPLE_BLOCKS + 2):
+                f.seek(min(index * step, size - SAMPLE_BLOCK_SIZE))
+                hasher.update(f.read(SAMPLE_BLOCK_SIZE))
+    return hasher.hexdigest()
+
+
+def file_fingerprint(path, content=None):
+    """
+    Return a string that changes whenever the file at `path` changes.
+    `content` forces the sampled content hash on or off; by default it follows LATENT_INPUT_CONTENT_HASH.
+    """
+    real_path, size, mtime_ns, inode = stat_signature(path)
+    fingerprint = f"{size}:{mtime_ns}:{inode}"
+    if content is None:
+        content = content_hash_enabled()
+    if not content:
+        return fingerprint
+
+    memo_key = (real_path, size, mtime_ns)
+    with _memo_lock:
+        digest = _memo.get(memo_key)
+        if digest is not None:
+            _memo.move_to_end(memo_key)
+    if digest is None:
+        digest = sampled_content_hash(real_path, size)
+        with _memo_lock:
+            _memo[memo_key] = digest
+            if len(_memo) > _MEMO_MAX_ENTRIES:
+                _memo.popitem(last=False)
+    return f"{fingerprint}:{digest}"
+
+
+def text_fingerprint(text):
+    """Return a short hash of a string input."""
+    hasher = _new_hasher()
+    hasher.update(text.encode("utf-8", "surrogatepass"))
+    return hasher.hexdigest()
@@ -0,0 +1,147 @@
+"""
+批量图片解码
+默认在线程池中并行解码；可选的进程池用 forkserver / spawn 启动子进程（不会fork正在运行多个线程的ComfyUI服务器进程），
+子进程只返回像素数组（8位图片为uint8）和workflow解析结果，由主进程一次性写入预先分配的IMAGE batch
+元数据读取和像素转换与单张图片的读取流程（ingest_image / pil_to_tensor）共用同一套函数
+"""
+
+import math
+import multiprocessing
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from PIL import Image, ImageOps
+
+from .image_helpers import HIGH_BIT_MODES, pil_to_array
+from .image_ingest import IMAGE_EXTENSIONS, ImageIngestResult, read_container_ingest, read_pil_ingest
+
+# 统一尺寸的方式
+RESIZE_METHODS = ["stretch", "crop center", "pad"]
+
+
+@dataclass
+class DecodedImage:
+    """
+    子进程解码一张图片的结果
+    """
+    path: str
+    pixels: Any = None                       # pil_to_array 的数组：uint8 [H, W, 3]，16位灰度为float32 [H, W]；解码失败时为None
+    scale: float = 1.0 / 255.0               # pixels乘以该系数得到 [0, 1] 范围的值
+    workflow_text: Optional[str] = None
+    parsed: tuple = ()                       # parse(prompt_data, workflow_data) 的返回值，未找到workflow时为空
+    error: Optional[str] = None
+    text_chunks: dict = field(default_factory=dict)
+
+
+def fit_image(img, size, method="stretch"):
+    """
+    把图片调整为 size=(width, height)
+    - stretch: 直接缩放
+    - crop center: 保持比例缩放后居中裁剪
+    - pad: 保持比例缩放后用黑边填充
+    """
+    if img.size == tuple(size):
+        return img
+    if method == "crop center":
+        return ImageOps.fit(img, size, Image.LANCZOS)
+    if method == "pad":
+        return ImageOps.pad(img, size, Image.LANCZOS, color=0 if len(img.getbands()) == 1 else (0, 0, 0))
+    return img.resize(size, Image.LANCZOS, reducing_gap=3.0)
+
+
+def decode_image_file(path, size=None, method="stretch", parse=None):
+    """
+    打开一次图片：读取workflow和API格式的prompt（可选地用parse(prompt_data, workflow_data)解析），解码为RGB并按需调整尺寸
+    在子进程中执行，因此不会抛出异常，错误记录在返回结果的error中
+    """
+    result = DecodedImage(path=path)
+    try:
+        ingest = ImageIngestResult()
+        with open(path, "rb") as f:
+            pil_metadata = read_container_ingest(f, ingest)
+            f.seek(0)
+            with Image.open(f) as img:
+                if pil_metadata:
+                    read_pil_ingest(img, ingest)
+                if size is not None:
+                    if img.format == 'JPEG':
+                        # draft模式让JPEG解码器直接输出不小于目标尺寸的缩小图
+                        img.draft(None, tuple(size))
+                    # 16位灰度转为I模式（int32）缩放以保留精度，其他模式先转为RGB
+                    target_mode = 'I' if img.mode in HIGH_BIT_MODES else 'RGB'
+                    if img.mode != target_mode:
+                        img = img.convert(target_mode)
+                    img = fit_image(img, size, method)
+                result.pixels, result.scale = pil_to_array(img)
+        result.workflow_text = ingest.workflow_text
+        result.text_chunks = ingest.text_chunks
+
+        if parse is not None and (ingest.workflow_data is not None or ingest.prompt_data is not None):
+            result.parsed = tuple(parse(ingest.prompt_data, ingest.workflow_data))
+    except Exception as e:
+        result.error = str(e)
+    return result
+
+
+def read_image_size(path):
+    """
+    只读取图片头得到 (width, height)，不解码像素
+    """
+    with Image.open(path) as img:
+        return img.size
+
+
+# 子进程中注册节点包但不执行它的 __init__（会导入ComfyUI的节点），之后才能按模块名反序列化任务函数
+# ComfyUI按目录路径加载自定义节点，子进程无法直接按包名导入
+_WORKER_BOOTSTRAP = """
+import importlib.util, sys
+if {name!r} not in sys.modules:
+    spec = importlib.util.spec_from_file_location({name!r}, {init!r}, submodule_search_locations=[{path!r}])
+    sys.modules[{name!r}] = importlib.util.module_from_spec(spec)
+"""
+
+
+def _process_context():
+    # 不使用fork：在多线程的服务器进程中fork可能复制被其他线程持有的锁，导致子进程死锁
+    # forkserver只在第一次使用时启动一个单线程的服务进程，之后从它fork子进程；不支持时使用spawn
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def _worker_initializer():
+    package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    package_name = __package__.rpartition(".")[0]
+    source = _WORKER_BOOTSTRAP.format(name=package_name, init=os.path.join(package_dir, "__init__.py"), path=package_dir)
+    # exec是内置函数，子进程不需要导入任何模块就能执行初始化
+    return exec, (source, {})
+
+
+def decode_images(paths, max_workers=None, size=None, method="stretch", parse=None, use_processes=False):
+    """
+    并行解码多张图片，返回与paths顺序一致的DecodedImage列表
+    默认使用线程池；use_processes为True时使用进程池（进程池不可用时回退到线程池）
+    进程池的每个子进程都是新的解释器，需要重新导入PIL、torch和本包的模块（spawn还会重新执行服务器的主模块），
+    启动需要几秒，只适合很大的batch；任务按块提交给进程池，减少进程间通信的次数
+    """
+    if not paths:
+        return []
+    max_workers = max(1, min(max_workers or os.cpu_count() or 1, len(paths)))
+    args = (paths, [size] * len(paths), [method] * len(paths), [parse] * len(paths))
+
+    context = _process_context() if use_processes and max_workers > 1 else None
+    if context is not None:
+        chunksize = max(1, math.ceil(len(paths) / (max_workers * 4)))
+        try:
+            initializer, initargs = _worker_initializer()
+            with ProcessPoolExecutor(max_workers=max_workers, mp_context=context,
+                                     initializer=initializer, initargs=initargs) as pool:
+                return list(pool.map(decode_image_file, *args, chunksize=chunksize))
+        except (BrokenProcessPool, OSError, pickle.PicklingError) as e:
+            print(f"进程池解码失败，改用线程池: {e}")
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(decode_image_file, *args))
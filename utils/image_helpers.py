@@ -3,48 +3,27 @@
 提供图片加载、workflow提取等功能
 """
 
-import json
 import base64
 from PIL import Image
-from PIL.ExifTags import TAGS
 from PIL.PngImagePlugin import PngInfo
 import io
 
+from .container_metadata import read_image_metadata
+from .json_backend import JSONDecodeError, loads
+from .prompt_classifier import classify_many
+
 
 def extract_workflow_from_image(image_path):
     """
-    从PNG图片中提取workflow信息
-    ComfyUI生成的图片通常在PNG的元数据中包含workflow信息
+    从图片中提取workflow信息，返回解析后的对象，未找到时返回None
+    与 ingest_image 使用同一套查找规则（image_ingest.find_workflow），不解码像素
     """
+    # image_ingest 依赖本模块，这里延迟导入
+    from .image_ingest import ingest_image
     try:
-        with Image.open(image_path) as img:
-            # 检查PNG信息
-            if hasattr(img, 'text'):
-                # 查找workflow相关的键
-                workflow_keys = ['workflow', 'Workflow', 'ComfyUI_workflow']
-                for key in workflow_keys:
-                    if key in img.text:
-                        workflow_text = img.text[key]
-                        try:
-                            return json.loads(workflow_text)
-                        except json.JSONDecodeError:
-                            continue
-            
-            # 检查EXIF数据
-            if hasattr(img, '_getexif'):
-                exif_data = img._getexif()
-                if exif_data:
-                    for tag_id, value in exif_data.items():
-                        tag = TAGS.get(tag_id, tag_id)
-                        if 'workflow' in str(tag).lower() or 'comfy' in str(tag).lower():
-                            try:
-                                return json.loads(value)
-                            except (json.JSONDecodeError, TypeError):
-                                continue
-    
+        return ingest_image(image_path, decode_pixels=False).workflow_data
     except Exception as e:
         print(f"提取workflow时出错: {e}")
-    
     return None
 
 
@@ -53,15 +32,14 @@ def extract_prompt_from_image(image_path):
     从图片中提取prompt信息
     """
     try:
-        with Image.open(image_path) as img:
-            if hasattr(img, 'text'):
-                # 查找prompt相关的键
-                prompt_keys = ['prompt', 'Prompt', 'positive', 'negative']
-                prompts = {}
-                for key in prompt_keys:
-                    if key in img.text:
-                        prompts[key] = img.text[key]
-                return prompts
+        metadata = read_image_metadata(image_path)
+        # 查找prompt相关的键
+        prompt_keys = ['prompt', 'Prompt', 'positive', 'negative']
+        prompts = {}
+        for key in prompt_keys:
+            if key in metadata.text:
+                prompts[key] = metadata.text[key]
+        return prompts
     
     except Exception as e:
         print(f"提取prompt时出错: {e}")
@@ -69,58 +47,204 @@ def extract_prompt_from_image(image_path):
     return {}
 
 
-def image_to_tensor(image_path):
+def fit_size(size, max_width=0, max_height=0):
     """
-    将图片转换为ComfyUI兼容的tensor格式
+    计算按比例缩小到 max_width x max_height 以内的尺寸，0表示该方向不限制；不会放大
+    """
+    width, height = size
+    scale = 1.0
+    if max_width > 0:
+        scale = min(scale, max_width / width)
+    if max_height > 0:
+        scale = min(scale, max_height / height)
+    if scale >= 1.0:
+        return width, height
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def reduce_image(img, max_width=0, max_height=0):
+    """
+    把图片缩小到 max_width x max_height 以内，必须在像素加载之前调用
+    只有JPEG能以较低分辨率解码：draft模式让解码器直接按1/2、1/4、1/8缩放输出，解码时间和内存随输出尺寸减少
+    PNG、WebP等格式仍然完整解码再缩小，只减小输出的尺寸，缩放本身会让加载比不设置最大尺寸更慢
+    缩放先用reduce()做整数倍的快速缩小，最后再用LANCZOS缩放到准确的尺寸
+    """
+    size = fit_size(img.size, max_width, max_height)
+    if size == img.size:
+        return img
+    if img.format == 'JPEG':
+        img.draft(None, size)
+    # reducing_gap: 先用reduce()缩小到目标尺寸的3倍以内，再精确缩放
+    return img.resize(size, Image.LANCZOS, reducing_gap=3.0)
+
+
+# 16位灰度模式（16位PNG），按65535归一化
+HIGH_BIT_MODES = ('I', 'I;16', 'I;16L', 'I;16B')
+
+
+def pil_to_array(img, with_alpha=False):
+    """
+    将PIL图片转换为numpy数组，返回 (数组, 缩放系数)，数组乘以缩放系数即为 [0, 1] 范围的值
+    - 16位灰度（HIGH_BIT_MODES）: float32 [H, W]，系数 1/65535，调用方按需扩展到三个通道
+    - 其他模式: uint8 [H, W, 3]；with_alpha为True且图片有alpha通道时为 [H, W, 4]，系数 1/255
     """
-    import torch
     import numpy as np
     
+    if img.mode in HIGH_BIT_MODES:
+        return np.asarray(img, dtype=np.float32), 1.0 / 65535.0
+    has_alpha = 'A' in img.getbands() or (img.mode == 'P' and 'transparency' in img.info)
+    target_mode = 'RGBA' if with_alpha and has_alpha else 'RGB'
+    if img.mode != target_mode:
+        img = img.convert(target_mode)
+    return np.asarray(img), 1.0 / 255.0
+
+
+def array_to_tensor(array):
+    """
+    numpy数组转为共享内存的tensor；PIL导出的数组是只读的，这里只读取它，忽略torch的不可写警告
+    """
+    import warnings
+    import torch
+    
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)
+        return torch.from_numpy(array)
+
+
+def copy_pixels(output, pixels):
+    """
+    把 pil_to_array 得到的像素（转换为tensor后）写入 [H, W, 3] 的输出，类型转换在copy_中完成
+    16位灰度图复制到三个通道，带alpha的只复制RGB
+    """
+    if pixels.ndim == 2:
+        output.copy_(pixels.unsqueeze(-1).expand(output.shape))
+    else:
+        output.copy_(pixels[..., :3])
+
+
+def pil_to_tensor(img, dtype=None, with_mask=False, out=None):
+    """
+    将PIL图片转换为ComfyUI的IMAGE格式 [1, H, W, 3]
+    直接写入预先分配好的输出tensor并原地缩放，不产生中间的float数组
+    - dtype: 输出精度，默认float32，也支持float16/bfloat16
+    - out: 可选的 [1, H, W, 3] 输出tensor（例如batch中的一个切片），提供时直接写入其中
+    - 16位PNG（I;16 / I 模式）按65535归一化
+    - with_mask为True时同时返回MASK [1, H, W]（1 - alpha），无alpha通道时为64x64的全零mask
+    """
+    import torch
+    
+    dtype = dtype or torch.float32
+    width, height = img.size
+    output = out if out is not None else torch.empty((1, height, width, 3), dtype=dtype)
+    mask = None
+    
+    array, scale = pil_to_array(img, with_alpha=with_mask)
+    pixels = array_to_tensor(array)
+    copy_pixels(output[0], pixels)
+    output.mul_(scale)
+    if pixels.ndim == 3 and pixels.shape[-1] == 4:
+        mask = torch.empty((1, height, width), dtype=torch.float32)
+        mask[0].copy_(pixels[..., 3])
+        mask.mul_(-1.0 / 255.0).add_(1.0)
+    
+    if not with_mask:
+        return output
+    if mask is None:
+        mask = torch.zeros((1, 64, 64), dtype=torch.float32)
+    return output, mask
+
+
+def frame_indices(frame_total, start=0, count=0, stride=1):
+    """
+    计算要读取的帧序号：从start开始每stride帧取一帧，最多count帧（0表示读到最后一帧）
+    """
+    indices = range(start, frame_total, max(1, stride))
+    return indices[:count] if count > 0 else indices
+
+
+def iter_frames(img, indices):
+    """
+    依次定位到指定的帧并逐帧返回，同一时间只有当前帧在内存中
+    返回的是同一个图片对象，下一次迭代时其内容会变成下一帧
+    """
+    for index in indices:
+        img.seek(index)
+        yield img
+
+
+def frames_to_tensor(img, start=0, count=0, stride=1, dtype=None, max_size=None):
+    """
+    把动图（GIF/WebP）或多页TIFF的指定帧解码为IMAGE batch [N, H, W, 3]
+    输出按帧数一次性分配，每帧解码后直接写入对应的切片，内存只与请求的帧数相关
+    尺寸与第一帧不同的帧会缩放到第一帧的尺寸；max_size为 (max_width, max_height)
+    """
+    import torch
+    
+    indices = frame_indices(getattr(img, 'n_frames', 1), start, count, stride)
+    if len(indices) == 0:
+        raise ValueError(f"图片只有 {getattr(img, 'n_frames', 1)} 帧，没有可读取的帧 (start={start})")
+    
+    output = None
+    for slot, frame in enumerate(iter_frames(img, indices)):
+        if max_size:
+            frame = reduce_image(frame, *max_size)
+        if output is None:
+            size = frame.size
+            output = torch.empty((len(indices), size[1], size[0], 3), dtype=dtype or torch.float32)
+        elif frame.size != size:
+            frame = frame.convert('RGB').resize(size, Image.LANCZOS)
+        pil_to_tensor(frame, out=output[slot:slot + 1])
+    return output
+
+
+def image_to_tensor(image_path):
+    """
+    将图片转换为ComfyUI兼容的tensor格式
+    """
     try:
         with Image.open(image_path) as img:
-            # 转换为RGB
-            if img.mode != 'RGB':
-                img = img.convert('RGB')
-            
-            # 转换为numpy数组
-            img_array = np.array(img)
-            
-            # 归一化到0-1
-            img_array = img_array.astype(np.float32) / 255.0
-            
-            # 转换为torch tensor，并添加batch维度
-            img_tensor = torch.from_numpy(img_array).unsqueeze(0)
-            
-            return img_tensor
+            return pil_to_tensor(img)
     
     except Exception as e:
         print(f"图片转tensor时出错: {e}")
         return None
 
 
-def validate_workflow_json(workflow_text):
+def parse_workflow_json(workflow_text):
     """
-    验证workflow JSON格式是否正确
+    解析并验证workflow JSON，只解析一次
+    返回 (workflow_data, 是否有效, 信息)；JSON本身无法解析时workflow_data为None
+    已经解析好的对象（dict）会直接验证，不再重复解析
     """
+    workflow_data = None
     try:
-        workflow_data = json.loads(workflow_text)
+        workflow_data = loads(workflow_text) if isinstance(workflow_text, (str, bytes)) else workflow_text
         
         # 检查基本结构
         if not isinstance(workflow_data, dict):
-            return False, "Workflow必须是JSON对象"
+            return workflow_data, False, "Workflow必须是JSON对象"
         
         if "nodes" not in workflow_data:
-            return False, "Workflow缺少nodes字段"
+            return workflow_data, False, "Workflow缺少nodes字段"
         
         if not isinstance(workflow_data["nodes"], list):
-            return False, "nodes字段必须是数组"
+            return workflow_data, False, "nodes字段必须是数组"
         
-        return True, "Workflow格式正确"
+        return workflow_data, True, "Workflow格式正确"
     
-    except json.JSONDecodeError as e:
-        return False, f"JSON格式错误: {str(e)}"
+    except JSONDecodeError as e:
+        return None, False, f"JSON格式错误: {str(e)}"
     except Exception as e:
-        return False, f"验证错误: {str(e)}"
+        return workflow_data, False, f"验证错误: {str(e)}"
+
+
+def validate_workflow_json(workflow_text):
+    """
+    验证workflow JSON格式是否正确
+    需要解析结果时使用 parse_workflow_json，避免再解析一次
+    """
+    _, valid, message = parse_workflow_json(workflow_text)
+    return valid, message
 
 
 def find_alekpet_nodes(workflow_data):
@@ -158,56 +282,51 @@ def extract_prompts_from_alekpet_nodes(alekpet_nodes):
     positive_prompts = []
     negative_prompts = []
     
-    def is_negative_prompt(text):
-        """
-        判断文本是否为negative prompt
-        """
-        text_lower = text.lower()
-        
-        # 首先检查明确的positive关键词
-        positive_keywords = ["masterpiece", "best quality", "best"]
-        for keyword in positive_keywords:
-            if keyword in text_lower:
-                return False  # 明确是positive
-        
-        # 然后检查明确的negative关键词
-        negative_keywords = ["worst", "bad"]
-        for keyword in negative_keywords:
-            if keyword in text_lower:
-                return True   # 明确是negative
-        
-        # 如果没有明确关键词，使用其他特征判断
-        # 以lora标签开头通常是positive
-        if text.strip().startswith("<lora:"):
-            return False
-        
-        # 包含更多negative特征词汇
-        extended_negative_keywords = [
-            "low quality", "normal quality", "bad anatomy", "bad hands", 
-            "watermark", "signature", "simple background", "transparent"
-        ]
-        for keyword in extended_negative_keywords:
-            if keyword in text_lower:
-                return True
-        
-        # 默认判断为positive（保守策略）
-        return False
-    
+    texts = []
     for node_info in alekpet_nodes:
         widgets_values = node_info.get("widgets_values", [])
         
         if widgets_values and len(widgets_values) > 0:
-            text_content = widgets_values[0]
-            
-            # 判断是positive还是negative
-            if is_negative_prompt(text_content):
-                negative_prompts.append(text_content)
-            else:
-                positive_prompts.append(text_content)
+            texts.append(widgets_values[0])
+    
+    # 判断是positive还是negative（关键词配置见 assets/configs/prompt_keywords.json）
+    for text_content, negative in zip(texts, classify_many(texts)):
+        if negative:
+            negative_prompts.append(text_content)
+        else:
+            positive_prompts.append(text_content)
     
     return positive_prompts, negative_prompts
 
 
+def count_node_types(workflow_data):
+    """
+    统计workflow中各类型节点的数量，返回 ({节点类型: 数量}, alekpet节点数量)
+    同时支持UI格式（nodes列表）和API格式（{id: {class_type, inputs}}）
+    """
+    node_types = {}
+    alekpet_count = 0
+    
+    if isinstance(workflow_data, dict) and "nodes" not in workflow_data:
+        # API格式
+        for node in workflow_data.values():
+            if isinstance(node, dict):
+                node_type = node.get("class_type", "Unknown")
+                node_types[node_type] = node_types.get(node_type, 0) + 1
+        return node_types, alekpet_count
+    
+    for node in workflow_data.get("nodes", []):
+        node_type = node.get("type", "Unknown")
+        node_types[node_type] = node_types.get(node_type, 0) + 1
+        
+        properties = node.get("properties", {})
+        cnr_id = properties.get("cnr_id", "")
+        if cnr_id == "comfyui_custom_nodes_alekpet":
+            alekpet_count += 1
+    
+    return node_types, alekpet_count
+
+
 def create_workflow_summary(workflow_data):
     """
     创建workflow摘要信息
@@ -217,17 +336,7 @@ def create_workflow_summary(workflow_data):
         total_nodes = len(nodes)
         
         # 统计节点类型
-        node_types = {}
-        alekpet_count = 0
-        
-        for node in nodes:
-            node_type = node.get("type", "Unknown")
-            node_types[node_type] = node_types.get(node_type, 0) + 1
-            
-            properties = node.get("properties", {})
-            cnr_id = properties.get("cnr_id", "")
-            if cnr_id == "comfyui_custom_nodes_alekpet":
-                alekpet_count += 1
+        node_types, alekpet_count = count_node_types(workflow_data)
         
         summary = f"Workflow包含 {total_nodes} 个节点"
         if alekpet_count > 0:
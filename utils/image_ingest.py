@@ -0,0 +1,186 @@
+"""
+图片统一读取流程
+只打开一次文件：先直接解析容器中的元数据，需要像素时再在同一个文件句柄上解码
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from PIL import Image
+
+from .container_metadata import read_container_metadata
+from .json_backend import JSONDecodeError, loads
+from .workflow_graph import is_api_prompt
+from .image_helpers import frames_to_tensor, pil_to_tensor, reduce_image
+
+# 可以读取的图片扩展名
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp', '.bmp', '.gif', '.tif', '.tiff')
+
+# PNG文本块中按顺序查找的workflow键
+WORKFLOW_TEXT_KEYS = ['workflow', 'Workflow', 'ComfyUI_workflow', 'prompt', 'parameters']
+
+# EXIF中Exif子IFD的标签号（UserComment等位于其中）
+EXIF_SUB_IFD = 0x8769
+
+
+@dataclass
+class ImageIngestResult:
+    """
+    一次读取图片得到的全部结果
+    """
+    image: Any = None                       # ComfyUI IMAGE tensor [1, H, W, C]，未解码像素时为None
+    workflow_text: Optional[str] = None     # 原始workflow JSON字符串
+    workflow_data: Any = None               # 解析后的workflow对象
+    source_key: Optional[str] = None        # workflow来源，例如 "text:workflow"、"info:comfy"、"exif:270"
+    text_chunks: dict = field(default_factory=dict)  # 图片中的全部文本元数据
+    prompt_data: Any = None                 # API格式的prompt（{id: {class_type, inputs}}），没有时为None
+    prompt_text: Optional[str] = None       # API格式prompt的原始JSON字符串
+
+
+def _try_json(text):
+    try:
+        return loads(text)
+    except (*JSONDecodeError, TypeError):
+        return None
+
+
+def read_exif_strings(img):
+    """
+    读取一次EXIF（IFD0和Exif子IFD），返回 {tag_id: 字符串值}
+    """
+    values = {}
+    try:
+        exif = img.getexif()
+    except Exception:
+        return values
+    for tag_id, value in exif.items():
+        if isinstance(value, str):
+            values[tag_id] = value
+    try:
+        for tag_id, value in exif.get_ifd(EXIF_SUB_IFD).items():
+            if isinstance(value, str):
+                values[tag_id] = value
+    except Exception:
+        pass
+    return values
+
+
+def find_workflow(text_chunks, info, exif_strings):
+    """
+    按原有优先级查找workflow：PNG文本块 -> info中带workflow/comfy的键 -> EXIF中包含workflow/comfy的值
+    返回 (原始文本, 解析后的对象, 来源键)，未找到时返回 (None, None, None)
+    """
+    for key in WORKFLOW_TEXT_KEYS:
+        if key in text_chunks:
+            data = _try_json(text_chunks[key])
+            if data is not None:
+                return text_chunks[key], data, f"text:{key}"
+
+    for key, value in info.items():
+        if isinstance(key, str) and ('workflow' in key.lower() or 'comfy' in key.lower()) and isinstance(value, str):
+            data = _try_json(value)
+            if data is not None:
+                return value, data, f"info:{key}"
+
+    for tag_id, value in exif_strings.items():
+        if 'workflow' in value.lower() or 'comfy' in value.lower():
+            # ComfyUI保存WebP时写入 "workflow:{...}" / "prompt:{...}" 形式的值
+            if not value.lstrip().startswith(('{', '[')) and ':' in value:
+                prefix, _, rest = value.partition(':')
+                if prefix.strip().isidentifier():
+                    value = rest
+            data = _try_json(value)
+            if data is not None:
+                return value, data, f"exif:{tag_id}"
+
+    return None, None, None
+
+
+def find_prompt_graph(text_chunks, exif_strings, found=(None, None, None)):
+    """
+    查找API格式的prompt：PNG的 "prompt" 文本块，或EXIF中 "prompt:{...}" 形式的值（ComfyUI保存的WebP）
+    found为 find_workflow 的结果，workflow本身就是API格式时直接复用，不再解析一次
+    返回 (原始文本, 解析后的对象)，未找到时返回 (None, None)
+    """
+    if is_api_prompt(found[1]):
+        return found[0], found[1]
+    candidates = []
+    if text_chunks.get('prompt'):
+        candidates.append(text_chunks['prompt'])
+    for value in exif_strings.values():
+        if value.lstrip().startswith('prompt:'):
+            candidates.append(value.partition(':')[2])
+    for text in candidates:
+        data = _try_json(text)
+        if is_api_prompt(data):
+            return text, data
+    return None, None
+
+
+def decode_image_tensor(img, dtype=None):
+    """
+    将已打开的图片解码为ComfyUI的IMAGE格式 [1, H, W, C]
+    """
+    return pil_to_tensor(img, dtype)
+
+
+def read_container_ingest(f, result):
+    """
+    直接从已打开的图片文件中读取文本块和EXIF，查找workflow和API格式的prompt并写入result（ImageIngestResult）
+    返回True表示容器格式无法直接解析（如BMP、TIFF），需要打开PIL图片后再调用 read_pil_ingest
+    """
+    metadata = None
+    try:
+        metadata = read_container_metadata(f)
+        found = find_workflow(metadata.text, metadata.text, metadata.exif)
+        if found[0] is None and metadata.format == "png":
+            # 兼容把文本块写在IDAT之后的PNG
+            metadata = read_container_metadata(f, stop_at_idat=False)
+            found = find_workflow(metadata.text, metadata.text, metadata.exif)
+        result.text_chunks = metadata.text
+        result.workflow_text, result.workflow_data, result.source_key = found
+        result.prompt_text, result.prompt_data = find_prompt_graph(metadata.text, metadata.exif, found)
+    except Exception as e:
+        print(f"提取workflow时出错: {e}")
+    return metadata is None or metadata.format is None
+
+
+def read_pil_ingest(img, result):
+    """
+    从PIL图片对象读取元数据并写入result，用于容器格式无法直接解析的情况
+    """
+    try:
+        text_chunks = dict(getattr(img, 'text', None) or {})
+        exif_strings = read_exif_strings(img)
+        found = find_workflow(text_chunks, img.info or {}, exif_strings)
+        result.text_chunks = text_chunks
+        result.workflow_text, result.workflow_data, result.source_key = found
+        result.prompt_text, result.prompt_data = find_prompt_graph(text_chunks, exif_strings, found)
+    except Exception as e:
+        print(f"提取workflow时出错: {e}")
+
+
+def ingest_image(image_path, decode_pixels=True, dtype=None, max_size=None, frames=None):
+    """
+    只打开一次图片文件：直接从容器中读取文本块和EXIF并查找workflow，需要像素时在同一个文件句柄上解码
+    无法直接解析的格式（如BMP、TIFF）回退到PIL读取元数据
+    像素解码失败时抛出异常；元数据读取失败只会导致workflow为空
+    dtype为输出IMAGE的精度（默认float32）
+    max_size为 (max_width, max_height)，设置时把图片缩小到该尺寸以内（0表示该方向不限制），只有JPEG直接以较低分辨率解码
+    frames为 (start, count, stride)，设置时把动图/多页图片的这些帧解码为一个batch；workflow只从容器中读取一次
+    """
+    result = ImageIngestResult()
+    with open(image_path, "rb") as f:
+        pil_metadata = read_container_ingest(f, result)
+        if decode_pixels or pil_metadata:
+            f.seek(0)
+            with Image.open(f) as img:
+                if pil_metadata:
+                    read_pil_ingest(img, result)
+                if decode_pixels and frames is not None:
+                    result.image = frames_to_tensor(img, *frames, dtype=dtype, max_size=max_size)
+                elif decode_pixels:
+                    if max_size:
+                        img = reduce_image(img, *max_size)
+                    result.image = decode_image_tensor(img, dtype)
+    return result
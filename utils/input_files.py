@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+Matching, ordering and windowing of input-directory files for the batch loader nodes.
+"""
+
+import glob
+import os
+
+SORT_ORDERS = ["name", "name (descending)", "modified", "modified (descending)", "size", "size (descending)"]
+
+
+def match_input_files(input_dir, path_pattern, directory_glob, extensions=None):
+    """
+    Expand a directory or glob pattern relative to `input_dir` into absolute file paths.
+    A directory expands to `directory_glob` inside it; `extensions` optionally filters the matches (lowercase, with dot).
+    Raises FileNotFoundError if any match escapes the input directory.
+    """
+    pattern = path_pattern.strip()
+    if pattern.startswith("input/"):
+        pattern = pattern[len("input/"):]
+    input_dir = os.path.abspath(input_dir)
+    full_pattern = os.path.join(input_dir, pattern)
+    if os.path.isdir(full_pattern):
+        full_pattern = os.path.join(full_pattern, directory_glob)
+
+    matches = []
+    for path in glob.glob(full_pattern, recursive=True):
+        path = os.path.abspath(path)
+        # Security check: every match must stay inside the input directory
+        if os.path.commonpath([path, input_dir]) != input_dir:
+            raise FileNotFoundError(f"Invalid path specified: {path_pattern}")
+        if extensions is not None and not path.lower().endswith(extensions):
+            continue
+        if os.path.isfile(path):
+            matches.append(path)
+    return matches
+
+
+def sort_paths(paths, sort_by):
+    """Order paths by one of SORT_ORDERS."""
+    descending = sort_by.endswith("(descending)")
+    if sort_by.startswith("modified"):
+        key = os.path.getmtime
+    elif sort_by.startswith("size"):
+        key = os.path.getsize
+    else:
+        key = os.path.basename
+    # Ties are broken by full path so the order is stable across runs
+    return sorted(sorted(paths), key=key, reverse=descending)
+
+
+def window_paths(paths, start, limit):
+    """Return `limit` paths from `start`; a limit of 0 keeps everything after `start`."""
+    return paths[start:start + limit] if limit > 0 else paths[start:]
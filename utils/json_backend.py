@@ -0,0 +1,110 @@
+"""
+可替换的JSON解析后端
+按 orjson -> simdjson -> ujson -> json 的顺序使用已安装的最快实现，
+可以用环境变量 LATENT_INPUT_JSON_BACKEND 指定（orjson / simdjson / ujson / json）
+快速后端拒绝、但标准库可以接受的输入（NaN / Infinity，非UTF-8的输入）会再用标准库解析一次，保证结果与json.loads一致；
+其他无效输入只解析一次
+"""
+
+import json
+import os
+
+
+def _load_orjson():
+    import orjson
+    return orjson.loads
+
+
+def _load_simdjson():
+    import simdjson
+    return simdjson.loads
+
+
+def _load_ujson():
+    import ujson
+    return ujson.loads
+
+
+def _load_json():
+    return json.loads
+
+
+BACKENDS = {
+    "orjson": _load_orjson,
+    "simdjson": _load_simdjson,
+    "ujson": _load_ujson,
+    "json": _load_json,
+}
+
+
+def _orjson_errors():
+    import orjson
+    return (orjson.JSONDecodeError,)
+
+
+def _simdjson_errors():
+    # pysimdjson没有单独的异常类，解析错误直接是ValueError
+    return (ValueError,)
+
+
+def _ujson_errors():
+    import ujson
+    return (getattr(ujson, "JSONDecodeError", ValueError),)
+
+
+DECODE_ERRORS = {
+    "orjson": _orjson_errors,
+    "simdjson": _simdjson_errors,
+    "ujson": _ujson_errors,
+    "json": lambda: (),
+}
+
+
+def _select_backend():
+    requested = os.environ.get("LATENT_INPUT_JSON_BACKEND", "").strip().lower()
+    names = [requested] if requested in BACKENDS else list(BACKENDS)
+    for name in names:
+        try:
+            return name, BACKENDS[name](), DECODE_ERRORS[name]()
+        except ImportError:
+            continue
+    return "json", json.loads, ()
+
+
+BACKEND_NAME, _fast_loads, _fast_errors = _select_backend()
+
+# 当前后端和标准库的解析错误类，用于 except JSONDecodeError；标准库解析无法解码的bytes时抛出UnicodeDecodeError
+JSONDecodeError = tuple(dict.fromkeys((json.JSONDecodeError, UnicodeDecodeError) + _fast_errors))
+
+
+def _stdlib_may_accept(text):
+    # 标准库接受而快速后端拒绝的输入：NaN / Infinity，UTF-16/32编码的bytes和含代理字符的str
+    if isinstance(text, str):
+        if "NaN" in text or "Infinity" in text:
+            return True
+        try:
+            text.encode("utf-8")
+        except UnicodeEncodeError:
+            return True
+    elif isinstance(text, (bytes, bytearray)):
+        if b"NaN" in text or b"Infinity" in text:
+            return True
+        try:
+            text.decode("utf-8")
+        except UnicodeDecodeError:
+            return True
+    return False
+
+
+def loads(text):
+    """
+    解析JSON字符串（str或bytes），失败时抛出 JSONDecodeError 中的某个异常
+    """
+    if _fast_loads is json.loads:
+        return json.loads(text)
+    try:
+        return _fast_loads(text)
+    except _fast_errors:
+        if not _stdlib_may_accept(text):
+            raise
+    return json.loads(text)
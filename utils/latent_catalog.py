@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+Header-only catalog of the latent files in a directory tree.
+
+Only container headers are read (safetensors JSON header, compressed
+container header, torch zip manifest), never tensor data. The catalog is
+persisted as a small JSON index and refreshed incrementally: files whose size
+and mtime are unchanged keep their cached entry.
+"""
+
+import json
+import os
+import struct
+import threading
+import time
+import zipfile
+
+from .latent_container import read_container_header
+from .latent_io import LATENT_FORMATS, SNIFF_BYTES
+
+CATALOG_VERSION = 1
+LATENT_EXTENSIONS = (".latent", ".safetensors")
+
+
+def _read_safetensors_header(path):
+    with open(path, "rb") as f:
+        (header_len,) = struct.unpack("<Q", f.read(8))
+        header = json.loads(f.read(header_len).decode("utf-8"))
+    tensors = {}
+    for key, info in header.items():
+        if key == "__metadata__":
+            continue
+        start, end = info.get("data_offsets", (0, 0))
+        tensors[key] = {"shape": info.get("shape", []), "dtype": info.get("dtype", ""), "nbytes": end - start}
+    return tensors
+
+
+def _read_container_header(path):
+    header = read_container_header(path)
+    return {
+        key: {"shape": info["shape"], "dtype": info["dtype"], "nbytes": info["nbytes"]}
+        for key, info in header.get("tensors", {}).items()
+    }
+
+
+def _read_torch_zip_manifest(path):
+    # Shapes live inside the pickled data.pkl, so only the storage records are listed
+    with zipfile.ZipFile(path) as archive:
+        storages = [info for info in archive.infolist() if "/data/" in info.filename]
+    return {}, sum(info.file_size for info in storages)
+
+
+# format name -> reader returning {key: {"shape", "dtype", "nbytes"}}; formats without a reader are listed without tensors
+HEADER_READERS = {
+    "safetensors": _read_safetensors_header,
+    "latent_container": _read_container_header,
+}
+
+
+def read_latent_header(path):
+    """Describe a latent file from its header only: {"format": ..., "tensors": {...}}."""
+    with open(path, "rb") as f:
+        head = f.read(SNIFF_BYTES)
+    fmt = next((fmt.name for fmt in LATENT_FORMATS if fmt.sniff(head)), None)
+    entry = {"format": fmt, "tensors": {}}
+    if fmt in HEADER_READERS:
+        entry["tensors"] = HEADER_READERS[fmt](path)
+    elif fmt == "torch_zip":
+        entry["tensors"], entry["data_bytes"] = _read_torch_zip_manifest(path)
+    return entry
+
+
+class LatentCatalog:
+    """
+    Incrementally refreshed index of the latent files below `root`, persisted to `index_path`.
+    """
+
+    def __init__(self, root, index_path=None):
+        self.root = os.path.abspath(root)
+        self.index_path = index_path
+        self.files = {}
+        self.last_scan = 0.0
+        self._lock = threading.Lock()
+        self._load_index()
+
+    def _load_index(self):
+        if not self.index_path or not os.path.exists(self.index_path):
+            return
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+            if index.get("version") == CATALOG_VERSION and index.get("root") == self.root:
+                self.files = index.get("files", {})
+        except (OSError, ValueError) as e:
+            print(f"[LatentCatalog] Ignoring unreadable index '{self.index_path}': {e}")
+
+    def _save_index(self):
+        if not self.index_path:
+            return
+        os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": CATALOG_VERSION, "root": self.root, "files": self.files}, f, separators=(",", ":"))
+        os.replace(tmp_path, self.index_path)
+
+    def _walk(self, directory):
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        yield from self._walk(entry.path)
+                    elif entry.name.lower().endswith(LATENT_EXTENSIONS) and entry.is_file():
+                        yield entry
+        except OSError:
+            return
+
+    def scan(self):
+        """Refresh the catalog, reading headers only for new or modified files. Returns the number of files re-read."""
+        with self._lock:
+            files = {}
+            refreshed = 0
+            for entry in self._walk(self.root):
+                rel_path = os.path.relpath(entry.path, self.root).replace(os.sep, "/")
+                st = entry.stat()
+                cached = self.files.get(rel_path)
+                if cached and cached["size"] == st.st_size and cached["mtime_ns"] == st.st_mtime_ns:
+                    files[rel_path] = cached
+                    continue
+                record = {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+                try:
+                    record.update(read_latent_header(entry.path))
+                except Exception as e:
+                    record.update({"format": None, "tensors": {}, "error": str(e)})
+                files[rel_path] = record
+                refreshed += 1
+
+            changed = refreshed > 0 or len(files) != len(self.files)
+            self.files = files
+            if changed:
+                self._save_index()
+            self.last_scan = time.time()
+            return refreshed
+
+    def query(self, text="", limit=500):
+        """
+        Return catalog entries whose path, tensor keys, dtypes or shapes contain `text` (case-insensitive), sorted by path.
+        """
+        needle = text.strip().lower()
+        results = []
+        for rel_path in sorted(self.files):
+            record = self.files[rel_path]
+            if needle:
+                haystack = rel_path.lower() + " " + " ".join(
+                    f"{key} {info.get('dtype', '')} {info.get('shape', '')}".lower()
+                    for key, info in record.get("tensors", {}).items()
+                )
+                if needle not in haystack:
+                    continue
+            results.append(dict(record, path=rel_path))
+            if limit and len(results) >= limit:
+                break
+        return results
@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+"""
+Compact, compressed latent container.
+
+Layout:
+    b"LTNZ" | version (u8) | 3 reserved bytes | header length (u64 LE) | JSON header | chunk data
+
+The JSON header stores, for every tensor, its dtype, shape, codec and the
+(offset, compressed length) of each fixed-size chunk of its raw bytes, so the
+shape and dtype can be read without decompressing anything. Loading
+decompresses chunk by chunk straight into a preallocated tensor.
+"""
+
+import json
+import math
+import struct
+import zlib
+
+import torch
+
+from .latent_io import register_latent_format, select_latent_key
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
+CONTAINER_MAGIC = b"LTNZ"
+CONTAINER_VERSION = 1
+# magic, version, reserved, header length
+_PREAMBLE = struct.Struct("<4sB3xQ")
+
+# Raw bytes per compressed chunk; bounds the transient memory of save and load
+DEFAULT_CHUNK_SIZE = 4 * 1024 * 1024
+
+# Down-cast choices of the save node; "keep" stores the tensor's own dtype
+PRECISIONS = {
+    "keep": None,
+    "float16": torch.float16,
+    "bfloat16": torch.bfloat16,
+}
+
+
+def _zstd_compress(data, level):
+    return zstandard.ZstdCompressor(level=level).compress(data)
+
+
+def _zstd_decompress(data, raw_size):
+    return zstandard.ZstdDecompressor().decompress(data, max_output_size=raw_size)
+
+
+def _lz4_compress(data, level):
+    return lz4.frame.compress(data, compression_level=level)
+
+
+def _lz4_decompress(data, raw_size):
+    return lz4.frame.decompress(data)
+
+
+def _zlib_compress(data, level):
+    return zlib.compress(data, max(0, min(level, 9)))
+
+
+def _zlib_decompress(data, raw_size):
+    return zlib.decompress(data, bufsize=raw_size)
+
+
+# codec name -> (compress(data, level), decompress(data, raw_size)); zlib is always available
+CODECS = {"zlib": (_zlib_compress, _zlib_decompress)}
+if zstandard is not None:
+    CODECS["zstd"] = (_zstd_compress, _zstd_decompress)
+if lz4 is not None:
+    CODECS["lz4"] = (_lz4_compress, _lz4_decompress)
+
+
+def available_codecs():
+    """Codec names usable on this machine, preferred first."""
+    return [name for name in ("zstd", "lz4", "zlib") if name in CODECS]
+
+
+def _dtype_name(dtype):
+    return str(dtype).replace("torch.", "")
+
+
+def save_latent_container(path, tensors, codec="zstd", level=3, dtype=None, metadata=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Write `tensors` ({name: tensor}) to `path`, optionally down-casting floating
+    point tensors to `dtype`. Returns the number of bytes written.
+    """
+    if codec not in CODECS:
+        raise ValueError(f"Compression codec '{codec}' is not available. Available codecs: {', '.join(available_codecs())}")
+    compress = CODECS[codec][0]
+
+    entries = {}
+    chunks = []
+    offset = 0
+    for name, tensor in tensors.items():
+        tensor = tensor.detach().cpu()
+        if dtype is not None and tensor.is_floating_point():
+            tensor = tensor.to(dtype)
+        raw = memoryview(tensor.contiguous().reshape(-1).view(torch.uint8).numpy())
+        chunk_table = []
+        for start in range(0, len(raw), chunk_size):
+            data = compress(raw[start:start + chunk_size], level)
+            chunk_table.append([offset, len(data)])
+            chunks.append(data)
+            offset += len(data)
+        entries[name] = {
+            "dtype": _dtype_name(tensor.dtype),
+            "shape": list(tensor.shape),
+            "codec": codec,
+            "chunk_size": chunk_size,
+            "nbytes": len(raw),
+            "chunks": chunk_table,
+        }
+
+    header = json.dumps({"tensors": entries, "metadata": metadata or {}}, separators=(",", ":")).encode("utf-8")
+    with open(path, "wb") as f:
+        f.write(_PREAMBLE.pack(CONTAINER_MAGIC, CONTAINER_VERSION, len(header)))
+        f.write(header)
+        for data in chunks:
+            f.write(data)
+    return _PREAMBLE.size + len(header) + offset
+
+
+def _read_header(f):
+    magic, version, header_len = _PREAMBLE.unpack(f.read(_PREAMBLE.size))
+    if magic != CONTAINER_MAGIC:
+        raise ValueError("Not a compressed latent container")
+    if version > CONTAINER_VERSION:
+        raise ValueError(f"Unsupported latent container version {version}")
+    header = json.loads(f.read(header_len).decode("utf-8"))
+    return header, _PREAMBLE.size + header_len
+
+
+def read_container_header(path):
+    """Return the JSON header ({"tensors": ..., "metadata": ...}) without touching chunk data."""
+    with open(path, "rb") as f:
+        return _read_header(f)[0]
+
+
+def _decompress_range(f, data_start, entry, lo, hi):
+    """Decompress raw bytes [lo, hi) of a tensor into a new uint8 tensor, reading only overlapping chunks."""
+    if entry["codec"] not in CODECS:
+        raise ValueError(f"Latent container uses codec '{entry['codec']}', which is not installed")
+    decompress = CODECS[entry["codec"]][1]
+    chunk_size = entry["chunk_size"]
+    nbytes = entry["nbytes"]
+    out = torch.empty(hi - lo, dtype=torch.uint8)
+    view = memoryview(out.numpy())
+    for index in range(lo // chunk_size, math.ceil(hi / chunk_size)):
+        offset, length = entry["chunks"][index]
+        raw_start = index * chunk_size
+        raw_size = min(chunk_size, nbytes - raw_start)
+        f.seek(data_start + offset)
+        data = decompress(f.read(length), raw_size)
+        # Copy only the part of this chunk that falls inside [lo, hi)
+        copy_start = max(lo, raw_start)
+        copy_end = min(hi, raw_start + raw_size)
+        view[copy_start - lo:copy_end - lo] = memoryview(data)[copy_start - raw_start:copy_end - raw_start]
+    return out
+
+
+def load_container_latent(path, select=None):
+    """
+    Decoder for the latent format registry. With `select`, only the chunks
+    covering the requested batch window are decompressed.
+    """
+    with open(path, "rb") as f:
+        header, data_start = _read_header(f)
+        entries = header.get("tensors", {})
+
+        key = select_latent_key(list(entries.keys()), lambda k: math.prod(entries[k]["shape"]))
+        if key is None:
+            return None
+        entry = entries[key]
+        dtype = getattr(torch, entry["dtype"])
+        shape = tuple(entry["shape"])
+
+        slices = select(shape) if select is not None else ()
+        if not slices:
+            return _decompress_range(f, data_start, entry, 0, entry["nbytes"]).view(dtype).reshape(shape)
+
+        # The batch dimension is outermost, so a batch window is one contiguous byte range
+        batch = slices[0]
+        item_bytes = entry["nbytes"] // shape[0] if shape[0] else 0
+        raw = _decompress_range(f, data_start, entry, batch.start * item_bytes, batch.stop * item_bytes)
+        samples = raw.view(dtype).reshape((batch.stop - batch.start,) + shape[1:])
+        if len(slices) > 1:
+            samples = samples[(slice(None),) + tuple(slices[1:])].clone()
+        return samples
+
+
+def describe_container_latent(path):
+    """Return the (shape, dtype) of the tensor load_container_latent would return, from the header only."""
+    entries = read_container_header(path).get("tensors", {})
+    key = select_latent_key(list(entries.keys()), lambda k: math.prod(entries[k]["shape"]))
+    if key is None:
+        return None
+    return tuple(entries[key]["shape"]), getattr(torch, entries[key]["dtype"])
+
+
+register_latent_format(
+    "latent_container", lambda head: head[:4] == CONTAINER_MAGIC, load_container_latent,
+    first=True, describe=describe_container_latent,
+)
@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+"""
+Low-level readers for .latent files.
+"""
+
+import math
+from collections import namedtuple
+
+import torch
+from safetensors import safe_open
+
+# Number of leading bytes handed to each format's sniffer
+SNIFF_BYTES = 16
+
+# Keys checked, in order, before falling back to the first non-empty tensor
+PREFERRED_LATENT_KEYS = ("samples", "latent_tensor")
+
+# safetensors header dtype names
+SAFETENSORS_DTYPES = {
+    "F64": torch.float64,
+    "F32": torch.float32,
+    "F16": torch.float16,
+    "BF16": torch.bfloat16,
+    "I64": torch.int64,
+    "I32": torch.int32,
+    "I16": torch.int16,
+    "I8": torch.int8,
+    "U8": torch.uint8,
+    "BOOL": torch.bool,
+}
+
+
+def select_latent_key(keys, numel_of):
+    """
+    Pick the key holding the latent tensor.
+
+    `keys` is the ordered list of candidate keys and `numel_of(key)` returns the
+    element count of a key, or None when the value is not a tensor.
+    """
+    for key in PREFERRED_LATENT_KEYS:
+        if key in keys and numel_of(key) is not None:
+            return key
+    for key in keys:
+        numel = numel_of(key)
+        if numel is not None and numel > 0:
+            return key
+    return None
+
+
+def pick_latent_tensor(latent_data):
+    """Return the latent tensor from a loaded dict or bare tensor, or None."""
+    if torch.is_tensor(latent_data):
+        return latent_data
+    if isinstance(latent_data, dict):
+        def numel_of(key):
+            value = latent_data[key]
+            return value.numel() if torch.is_tensor(value) else None
+
+        key = select_latent_key(list(latent_data.keys()), numel_of)
+        if key is not None:
+            return latent_data[key]
+    return None
+
+
+class LatentRegionError(ValueError):
+    """Raised when a requested batch/frame window lies outside the stored tensor."""
+
+
+def latent_region_slices(shape, batch_start=0, batch_count=0, frame_start=0, frame_count=0):
+    """
+    Translate a batch/frame window into index slices for a stored tensor of `shape`.
+
+    3D tensors have an implicit batch of one, 4D tensors are [B, C, H, W] and
+    5D video latents are [B, C, T, H, W]. A count of 0 means "to the end".
+    A frame window on a latent without a frame axis raises LatentRegionError
+    instead of silently returning every frame.
+    """
+    ndim = len(shape)
+    if ndim != 5 and (frame_start > 0 or frame_count > 0):
+        raise LatentRegionError(f"frame_start/frame_count only apply to 5D video latents, not to a latent of shape {list(shape)}.")
+    if ndim == 3:
+        if batch_start > 0:
+            raise LatentRegionError(f"batch_start {batch_start} is out of range for a single-item latent of shape {list(shape)}.")
+        return ()
+
+    def window(start, count, size, label):
+        if start >= size:
+            raise LatentRegionError(f"{label}_start {start} is out of range for a latent of shape {list(shape)}.")
+        return slice(start, min(size, start + count) if count > 0 else size)
+
+    slices = (window(batch_start, batch_count, shape[0], "batch"),)
+    if ndim == 5:
+        slices += (slice(None), window(frame_start, frame_count, shape[2], "frame"))
+    return slices
+
+
+def make_region_selector(batch_start=0, batch_count=0, frame_start=0, frame_count=0):
+    """Return a `select(shape)` callback for the given window, or None for the whole tensor."""
+    if not (batch_start or batch_count or frame_start or frame_count):
+        return None
+    return lambda shape: latent_region_slices(shape, batch_start, batch_count, frame_start, frame_count)
+
+
+def load_safetensors_latent(path, select=None):
+    """
+    Read a safetensors latent, materializing only the selected tensor.
+
+    Only the JSON header is parsed to choose the key; the file is memory-mapped,
+    so the bytes of the other tensors are never read. When `select` is given,
+    only the requested region of the tensor is read through the slice API.
+    The result never aliases the mapping: the file may be rewritten in place
+    (the upload route overwrites by name) while the tensor is still in use.
+    Returns None when no tensor qualifies.
+    """
+    with safe_open(path, framework="pt", device="cpu") as f:
+        def numel_of(key):
+            return math.prod(f.get_slice(key).get_shape())
+
+        key = select_latent_key(list(f.keys()), numel_of)
+        if key is None:
+            return None
+        if select is not None:
+            tensor_slice = f.get_slice(key)
+            slices = select(tensor_slice.get_shape())
+            if slices:
+                return _copy_off_mapping(tensor_slice[slices])
+        return _copy_off_mapping(f.get_tensor(key))
+
+
+def describe_safetensors_latent(path):
+    """Return the (shape, dtype) of the tensor load_safetensors_latent would return, from the header only."""
+    with safe_open(path, framework="pt", device="cpu") as f:
+        key = select_latent_key(list(f.keys()), lambda k: math.prod(f.get_slice(k).get_shape()))
+        if key is None:
+            return None
+        tensor_slice = f.get_slice(key)
+        return tuple(tensor_slice.get_shape()), SAFETENSORS_DTYPES[tensor_slice.get_dtype()]
+
+
+def _copy_off_mapping(mapped):
+    # get_tensor and slice reads return views of the shared mmap; truncating the file under them raises SIGBUS on access
+    owned = torch.empty(mapped.shape, dtype=mapped.dtype)
+    owned.copy_(mapped)
+    return owned
+
+
+def load_torch_latent(path, select=None):
+    """Read a PyTorch archive (zip-based or legacy pickle) onto the CPU."""
+    samples = pick_latent_tensor(torch.load(path, map_location="cpu", weights_only=False))
+    if samples is not None and select is not None:
+        slices = select(tuple(samples.shape))
+        if slices:
+            # Copy so the slice does not keep the full tensor alive
+            samples = samples[slices].clone()
+    return samples
+
+
+def _sniff_safetensors(head):
+    # u64 little-endian header length followed by the JSON header itself
+    if len(head) < 9:
+        return False
+    header_len = int.from_bytes(head[:8], "little")
+    return 0 < header_len <= 100 * 1024 * 1024 and head[8:9] == b"{"
+
+
+def _sniff_torch_zip(head):
+    return head[:4] == b"PK\x03\x04"
+
+
+def _sniff_torch_pickle(head):
+    # PROTO opcode followed by a pickle protocol version
+    return len(head) >= 2 and head[0] == 0x80 and 2 <= head[1] <= 5
+
+
+LatentFormat = namedtuple("LatentFormat", ["name", "sniff", "load", "describe"], defaults=(None,))
+
+# Checked in order; the first format whose sniffer accepts the file's leading bytes wins
+LATENT_FORMATS = [
+    LatentFormat("safetensors", _sniff_safetensors, load_safetensors_latent, describe_safetensors_latent),
+    LatentFormat("torch_zip", _sniff_torch_zip, load_torch_latent),
+    LatentFormat("torch_pickle", _sniff_torch_pickle, load_torch_latent),
+]
+
+
+def register_latent_format(name, sniff, load, first=False, describe=None):
+    """
+    Register a container format.
+
+    `sniff(head)` receives the first SNIFF_BYTES bytes of the file and returns
+    True when it recognizes them. `load(path, select=None)` returns the latent
+    tensor (or None when the file holds none); `select(shape)`, when given,
+    returns the index slices of the region to read (see latent_region_slices).
+    The optional `describe(path)` returns the (shape, dtype) that `load` would
+    return without reading tensor data, or None when the file holds no tensor.
+    Registering an existing name replaces it.
+    """
+    LATENT_FORMATS[:] = [fmt for fmt in LATENT_FORMATS if fmt.name != name]
+    fmt = LatentFormat(name, sniff, load, describe)
+    if first:
+        LATENT_FORMATS.insert(0, fmt)
+    else:
+        LATENT_FORMATS.append(fmt)
+    return fmt
+
+
+def detect_latent_format(path):
+    """Return the LatentFormat matching the file's leading bytes, or None."""
+    with open(path, "rb") as f:
+        head = f.read(SNIFF_BYTES)
+    for fmt in LATENT_FORMATS:
+        if fmt.sniff(head):
+            return fmt
+    return None
+
+
+def load_latent_tensor(path, select=None):
+    """Dispatch straight to the decoder of the detected container format."""
+    fmt = detect_latent_format(path)
+    if fmt is None:
+        known = ", ".join(f.name for f in LATENT_FORMATS)
+        raise ValueError(f"Unrecognized container format (known formats: {known})")
+    return fmt.load(path, select)
+
+
+def describe_latent_tensor(path):
+    """
+    Return the (shape, dtype) of the tensor load_latent_tensor would return, reading headers only.
+    Returns None when the format can only tell by loading the tensor (e.g. PyTorch archives).
+    """
+    fmt = detect_latent_format(path)
+    if fmt is None or fmt.describe is None:
+        return None
+    return fmt.describe(path)
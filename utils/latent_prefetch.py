@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+Opt-in background prefetcher that reads latents referenced by queued prompts
+before they execute.
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+def prefetch_enabled():
+    """Prefetching is opt-in through LATENT_INPUT_PREFETCH=1."""
+    return os.environ.get("LATENT_INPUT_PREFETCH", "").strip().lower() in ("1", "true", "yes", "on")
+
+
+def advise_page_cache(path):
+    """Ask the OS to read `path` into the page cache without loading it into this process."""
+    if not hasattr(os, "posix_fadvise"):
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+    finally:
+        os.close(fd)
+
+
+class LatentPrefetcher:
+    """
+    Polls the prompt queue and warms the latent cache for every loader node found in a queued prompt.
+
+    `get_prompts()` returns the API-format prompts currently waiting in the queue,
+    `resolve(latent_file)` maps a widget value to a checked absolute path and
+    `warm(latent_path, latent_file, inputs)` reads the file into the cache.
+    `fits(nbytes)` decides whether a file of that size may be prefetched now, so the
+    prefetcher never pushes the cache past its ceiling while a job is running.
+    """
+
+    def __init__(self, get_prompts, resolve, warm, fits, node_types=("LatentLoaderAdvanced",), max_workers=1, poll_interval=1.0):
+        self.get_prompts = get_prompts
+        self.resolve = resolve
+        self.warm = warm
+        self.fits = fits
+        self.node_types = set(node_types)
+        self.max_workers = max(1, max_workers)
+        self.poll_interval = poll_interval
+        self.prefetched = 0
+        self.skipped = 0
+        self.failed = 0
+        self._attempted = set()
+        self._in_flight = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._executor = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="latent-prefetch")
+        self._thread = threading.Thread(target=self._run, name="latent-prefetch-poll", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"[LatentPrefetcher] Error while scanning the queue: {e}")
+
+    def _referenced_latents(self):
+        for prompt in self.get_prompts():
+            for node in prompt.values():
+                if not isinstance(node, dict) or node.get("class_type") not in self.node_types:
+                    continue
+                inputs = node.get("inputs", {})
+                latent_file = inputs.get("latent_file")
+                # Linked inputs are [node_id, slot] lists and are only known at execution time
+                if isinstance(latent_file, str) and latent_file:
+                    yield latent_file, inputs
+
+    def poll(self):
+        """Schedule prefetches for the latents referenced by the queue. Returns the number scheduled."""
+        scheduled = 0
+        for latent_file, inputs in self._referenced_latents():
+            try:
+                latent_path = self.resolve(latent_file)
+                st = os.stat(latent_path)
+            except Exception:
+                continue
+            job_key = (latent_path, st.st_size, st.st_mtime_ns, tuple(sorted((k, v) for k, v in inputs.items() if isinstance(v, int))))
+            with self._lock:
+                if job_key in self._attempted or len(self._in_flight) >= self.max_workers:
+                    continue
+                if not self.fits(st.st_size):
+                    self.skipped += 1
+                    continue
+                # Bound the bookkeeping for long-running servers
+                if len(self._attempted) > 10000:
+                    self._attempted.clear()
+                self._attempted.add(job_key)
+                self._in_flight.add(job_key)
+            self._executor.submit(self._prefetch, job_key, latent_path, latent_file, inputs)
+            scheduled += 1
+        return scheduled
+
+    def _prefetch(self, job_key, latent_path, latent_file, inputs):
+        try:
+            self.warm(latent_path, latent_file, inputs)
+            self.prefetched += 1
+        except Exception as e:
+            self.failed += 1
+            print(f"[LatentPrefetcher] Could not prefetch '{latent_file}': {e}")
+        finally:
+            with self._lock:
+                self._in_flight.discard(job_key)
+
+    def stats(self):
+        with self._lock:
+            in_flight = len(self._in_flight)
+        return {"prefetched": self.prefetched, "skipped": self.skipped, "failed": self.failed, "in_flight": in_flight}
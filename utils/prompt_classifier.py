@@ -0,0 +1,154 @@
+"""
+提示词正向/负向分类
+关键词分为按优先级排列的若干层（配置见 assets/configs/prompt_keywords.json），命中的最高优先级的层决定结果：
+- keywords: 文本（小写后）包含其中任意一个关键词即命中
+- prefixes: 去掉首尾空白后的文本以其中任意一个前缀开头即命中（区分大小写）
+没有任何层命中时返回 default_negative
+
+关键词的匹配有两种实现，结果完全相同：
+- ahocorasick: 安装了 pyahocorasick 时，把所有层的关键词编译成一个自动机，一次扫描找出全部命中（包括重叠的）
+- scan: 逐层做子串查找；关键词不多时CPython的子串查找比自动机更快，
+  并且会预先去掉永远不会起决定作用的关键词（包含同层或更高层的某个关键词的关键词，例如 "best quality" 包含 "best"）
+默认在关键词数量达到 AUTOMATON_MIN_KEYWORDS 且安装了 pyahocorasick 时使用自动机
+"""
+
+import json
+import os
+
+DEFAULT_CONFIG_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "assets", "configs", "prompt_keywords.json"
+)
+
+# 关键词少于这个数量时逐个子串查找更快
+AUTOMATON_MIN_KEYWORDS = 24
+
+MATCHERS = ("auto", "ahocorasick", "scan")
+
+
+def _build_automaton(tier_of):
+    import ahocorasick
+    automaton = ahocorasick.Automaton()
+    for keyword, tier in tier_of.items():
+        automaton.add_word(keyword, tier)
+    automaton.make_automaton()
+    return automaton
+
+
+class PromptClassifier:
+    """
+    tiers: [{"name": ..., "negative": bool, "keywords": [...], "prefixes": [...]}, ...]，越靠前优先级越高
+    matcher: "auto" / "ahocorasick" / "scan"
+    """
+    def __init__(self, tiers, default_negative=False, matcher="auto"):
+        if matcher not in MATCHERS:
+            raise ValueError(f"未知的匹配方式: {matcher}，可选: {', '.join(MATCHERS)}")
+        self.tiers = []
+        self.default_negative = bool(default_negative)
+        self._prefix_tiers = []
+        tier_of = {}
+        for index, tier in enumerate(tiers):
+            keywords = tuple(keyword.lower() for keyword in tier.get("keywords", ()) if keyword)
+            prefixes = tuple(prefix for prefix in tier.get("prefixes", ()) if prefix)
+            self.tiers.append((tier.get("name", str(index)), bool(tier.get("negative", False)), keywords, prefixes))
+            for keyword in keywords:
+                # 同一个关键词出现在多层时以高优先级的层为准
+                tier_of.setdefault(keyword, index)
+            if prefixes:
+                self._prefix_tiers.append((index, prefixes))
+        self._no_match = len(self.tiers)
+
+        self._automaton = None
+        if matcher == "ahocorasick" or (matcher == "auto" and len(tier_of) >= AUTOMATON_MIN_KEYWORDS):
+            try:
+                self._automaton = _build_automaton(tier_of)
+            except ImportError:
+                if matcher == "ahocorasick":
+                    raise
+        self.matcher = "ahocorasick" if self._automaton is not None else "scan"
+
+        # scan: 只保留可能起决定作用的关键词，按层分组
+        kept = [keyword for keyword in tier_of
+                if not any(other != keyword and other in keyword and tier_of[other] <= tier_of[keyword] for other in tier_of)]
+        self._scan_tiers = [(index, tuple(keyword for keyword in kept if tier_of[keyword] == index))
+                            for index in sorted({tier_of[keyword] for keyword in kept})]
+
+    @classmethod
+    def from_config(cls, path=None, matcher="auto"):
+        """
+        从JSON配置文件创建分类器，path为空时使用环境变量 LATENT_INPUT_PROMPT_KEYWORDS 或默认配置
+        """
+        path = path or os.environ.get("LATENT_INPUT_PROMPT_KEYWORDS") or DEFAULT_CONFIG_PATH
+        with open(path, "r", encoding="utf-8") as f:
+            config = json.load(f)
+        return cls(config["tiers"], config.get("default_negative", False), matcher)
+
+    def matched_tier(self, text):
+        """
+        返回命中的关键词层中优先级最高的层序号，没有命中时返回层数
+        """
+        text_lower = text.lower()
+        if self._automaton is not None:
+            best = self._no_match
+            for _, tier in self._automaton.iter(text_lower):
+                if tier < best:
+                    best = tier
+                    if best == 0:
+                        break
+            return best
+        for index, keywords in self._scan_tiers:
+            for keyword in keywords:
+                if keyword in text_lower:
+                    return index
+        return self._no_match
+
+    def is_negative(self, text):
+        """
+        判断文本是否为negative prompt
+        """
+        best = self.matched_tier(text)
+        for index, prefixes in self._prefix_tiers:
+            if index > best:
+                break
+            if text.strip().startswith(prefixes):
+                return self.tiers[index][1]
+        if best < self._no_match:
+            return self.tiers[best][1]
+        return self.default_negative
+
+    def classify_many(self, texts):
+        """
+        批量分类，返回与texts等长的bool列表（True为negative），相同的文本只分类一次
+        """
+        texts = list(texts)
+        decisions = {}
+        for text in texts:
+            if text not in decisions:
+                decisions[text] = self.is_negative(text)
+        return [decisions[text] for text in texts]
+
+
+_default_classifier = None
+
+
+def get_prompt_classifier():
+    """
+    返回按默认配置创建的共享分类器
+    """
+    global _default_classifier
+    if _default_classifier is None:
+        _default_classifier = PromptClassifier.from_config()
+    return _default_classifier
+
+
+def is_negative_prompt(text):
+    """
+    用默认配置判断文本是否为negative prompt
+    """
+    return get_prompt_classifier().is_negative(text)
+
+
+def classify_many(texts):
+    """
+    用默认配置批量判断，返回bool列表（True为negative）
+    """
+    return get_prompt_classifier().classify_many(texts)
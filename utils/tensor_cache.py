@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""
+Process-wide, byte-budgeted LRU cache for tensors read from disk.
+
+Entries are keyed on the resolved file path plus its (size, mtime_ns, inode)
+signature, so a file that is overwritten in place is never served stale.
+Cached tensors are never handed out directly: every hit returns a clone, so a
+downstream node modifying its input in place cannot corrupt the cache.
+
+The cache itself does not need torch, so caches of plain values (such as the
+workflow parse memo) keep working in scripts that run without it.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+try:
+    import torch
+except ImportError:
+    torch = None
+
+from .fingerprint import stat_signature
+
+
+def env_int(name, default, scale=1):
+    """Read a non-negative number from the environment times `scale`, falling back to `default`."""
+    try:
+        return max(0, int(float(os.environ.get(name, default)) * scale))
+    except (TypeError, ValueError):
+        return int(default * scale)
+
+
+def env_megabytes(name, default):
+    """Read a size in megabytes from the environment, falling back to `default`."""
+    return env_int(name, default, 1024 * 1024)
+
+
+def tensor_nbytes(value):
+    """
+    Return the number of bytes held by the tensors inside `value`.
+    Strings and bytes (e.g. raw workflow JSON kept next to an image) count
+    towards the size as well, so metadata entries cannot escape the budget.
+    """
+    if torch is not None and torch.is_tensor(value):
+        return value.element_size() * value.nelement()
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(tensor_nbytes(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(tensor_nbytes(v) for v in value)
+    return 0
+
+
+def clone_tensors(value):
+    """Deep-copy the tensors inside `value`, leaving every other object shared."""
+    if torch is not None and torch.is_tensor(value):
+        return value.clone()
+    if isinstance(value, dict):
+        return {k: clone_tensors(v) for k, v in value.items()}
+    if isinstance(value, tuple):
+        return tuple(clone_tensors(v) for v in value)
+    if isinstance(value, list):
+        return [clone_tensors(v) for v in value]
+    return value
+
+
+def file_key(path, *extra):
+    """
+    Build a cache key for `path` from its real path and stat signature.
+    Any `extra` values (e.g. a slice request) are appended to the key.
+    """
+    return stat_signature(path) + tuple(extra)
+
+
+class TensorLRUCache:
+    """
+    A thread-safe LRU cache bounded by the total byte size of its tensors,
+    and optionally by its number of entries. `max_bytes=None` bounds it by entries only.
+    Hits are passed through `copy` (clone_tensors by default); caches of immutable
+    values pass `copy=None` and hand out the cached object itself.
+    """
+
+    def __init__(self, max_bytes, name="tensor cache", max_entries=None, copy=clone_tensors):
+        self.name = name
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.copy = copy
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def get(self, key):
+        """Return a private copy of the cached value (see `copy`), or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            value = entry[0]
+        return self.copy(value) if self.copy is not None else value
+
+    def put(self, key, value):
+        """
+        Store `value` under `key`. The caller must not modify `value` afterwards;
+        use `get_or_load` when the value is also returned to a node.
+        Returns False when the cache is disabled or the value is larger than the whole budget.
+        """
+        nbytes = tensor_nbytes(value)
+        if (self.max_bytes is not None and (nbytes > self.max_bytes or self.max_bytes == 0)) or self.max_entries == 0:
+            return False
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old[1]
+            while self._entries and (
+                (self.max_bytes is not None and self.current_bytes + nbytes > self.max_bytes)
+                or (self.max_entries is not None and len(self._entries) >= self.max_entries)
+            ):
+                _, (_, evicted_bytes) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_bytes
+                self.evictions += 1
+            self._entries[key] = (value, nbytes)
+            self.current_bytes += nbytes
+        return True
+
+    def get_or_load(self, key, loader):
+        """
+        Return a private copy of the value for `key`, calling `loader()` on a miss.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+        value = loader()
+        if self.put(key, value) and self.copy is not None:
+            return self.copy(value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "name": self.name,
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            }
+
+
+# Shared by every LatentLoaderAdvanced instance. Set LATENT_INPUT_CACHE_MB=0 to disable.
+LATENT_CACHE = TensorLRUCache(env_megabytes("LATENT_INPUT_CACHE_MB", 1024), name="latent cache")
+
+# Decoded images and the raw workflow text found in them, shared by the workflow image loaders.
+# The text counts towards the budget; the entry count is bounded as well for tiny entries.
+IMAGE_CACHE = TensorLRUCache(env_megabytes("LATENT_INPUT_IMAGE_CACHE_MB", 1024), name="image cache", max_entries=4096)
@@ -0,0 +1,184 @@
+"""
+Workflow图结构
+同时支持两种格式，并建立 id -> 节点 的索引和连线解析：
+- UI格式（PNG中的 "workflow"）: {"nodes": [...], "links": [...]}
+- API格式（PNG中的 "prompt"）: {id: {"class_type": ..., "inputs": {...}, "_meta": {"title": ...}}}
+API格式更小、解析更快，而且连线直接写在inputs中
+"""
+
+# 可能保存提示词文本的输入名
+TEXT_INPUTS = ("text", "text_g", "text_l", "prompt", "string", "value")
+
+# 带有 positive / negative 输入的采样器节点，按优先级排列
+SAMPLER_TYPES = ("KSampler", "KSamplerAdvanced", "SamplerCustom", "CFGGuider")
+
+# 追踪连线的最大深度，防止异常workflow中的环路
+MAX_TRACE_DEPTH = 32
+
+# 只转发连线的节点（UI格式中输入类型为 "*"），建立连线索引时直接连到它们的上游
+REROUTE_TYPES = ("Reroute", "Reroute (rgthree)")
+
+
+def is_api_prompt(data):
+    """
+    判断是否为API格式：所有值都是带 class_type 的节点字典
+    """
+    if not isinstance(data, dict) or not data or "nodes" in data:
+        return False
+    return all(isinstance(node, dict) and "class_type" in node for node in data.values())
+
+
+def _is_link(value):
+    # API格式中的连线为 [源节点id, 输出序号]
+    return isinstance(value, list) and len(value) == 2 and isinstance(value[0], (str, int)) and isinstance(value[1], int)
+
+
+class WorkflowGraph:
+    """
+    统一访问两种格式的workflow：节点顺序、标题、类型、按id查找节点以及沿连线查找上游节点
+    """
+    def __init__(self, data):
+        self.api = is_api_prompt(data)
+        self.by_id = {}
+        self.links = {}
+        if self.api:
+            self.nodes = []
+            for node_id, node in data.items():
+                self.by_id[str(node_id)] = node
+                self.nodes.append(node)
+            return
+
+        nodes = data.get("nodes", []) if isinstance(data, dict) else []
+        self.nodes = nodes if isinstance(nodes, list) else []
+        for node in self.nodes:
+            if isinstance(node, dict) and "id" in node:
+                self.by_id[str(node["id"])] = node
+        links = data.get("links", []) if isinstance(data, dict) else []
+        for link in links if isinstance(links, list) else []:
+            # [link_id, 源节点id, 源输出序号, 目标节点id, 目标输入序号, 类型]，新版前端也可能是字典
+            if isinstance(link, list) and len(link) >= 3:
+                self.links[link[0]] = (str(link[1]), link[2])
+            elif isinstance(link, dict) and "id" in link:
+                self.links[link["id"]] = (str(link.get("origin_id")), link.get("origin_slot", 0))
+        for link_id, origin in self.links.items():
+            self.links[link_id] = self._skip_reroutes(origin)
+
+    def _skip_reroutes(self, origin):
+        # 沿Reroute节点的输入向上找到真正的源节点，Reroute没有连接输入时保持原样
+        for _ in range(MAX_TRACE_DEPTH):
+            node = self.by_id.get(origin[0])
+            if node is None or node.get("type") not in REROUTE_TYPES:
+                return origin
+            links = [node_input.get("link") for node_input in node.get("inputs") or ()
+                     if isinstance(node_input, dict) and node_input.get("link") is not None]
+            upstream = self.links.get(links[0]) if links else None
+            if upstream is None:
+                return origin
+            origin = upstream
+        return origin
+
+    def title(self, node):
+        if self.api:
+            meta = node.get("_meta")
+            return meta.get("title") if isinstance(meta, dict) else None
+        return node.get("title")
+
+    def node_type(self, node):
+        return node.get("class_type") if self.api else node.get("type")
+
+    def source(self, node, input_name):
+        """
+        返回连接到 input_name 输入的上游 (节点, 输出序号)，未连接时返回 (None, None)
+        """
+        if self.api:
+            inputs = node.get("inputs")
+            value = inputs.get(input_name) if isinstance(inputs, dict) else None
+            if _is_link(value):
+                return self.by_id.get(str(value[0])), value[1]
+            return None, None
+        for node_input in node.get("inputs") or ():
+            if isinstance(node_input, dict) and node_input.get("name") == input_name and node_input.get("link") is not None:
+                origin = self.links.get(node_input["link"])
+                if origin is not None:
+                    return self.by_id.get(origin[0]), origin[1]
+        return None, None
+
+    def _conditioning_inputs(self, node):
+        if self.api:
+            inputs = node.get("inputs")
+            if not isinstance(inputs, dict):
+                return []
+            return [name for name, value in inputs.items()
+                    if _is_link(value) and ("conditioning" in name or name in ("positive", "negative"))]
+        return [node_input.get("name") for node_input in node.get("inputs") or ()
+                if isinstance(node_input, dict) and node_input.get("type") == "CONDITIONING" and node_input.get("link") is not None]
+
+    def literal(self, value, depth=0):
+        """
+        把输入值解析为字面量：连线会沿上游节点查找其文本/数值
+        """
+        if not _is_link(value) or not self.api:
+            return value
+        node = self.by_id.get(str(value[0]))
+        return self.node_text(node, depth + 1) if node is not None else None
+
+    def node_text(self, node, depth=0):
+        """
+        读取文本编码节点（或字符串节点）的文本，找不到时返回None
+        """
+        if depth > MAX_TRACE_DEPTH:
+            return None
+        if self.api:
+            inputs = node.get("inputs")
+            if not isinstance(inputs, dict):
+                return None
+            for name in TEXT_INPUTS:
+                if name in inputs:
+                    value = self.literal(inputs[name], depth)
+                    if isinstance(value, str):
+                        return value
+            return None
+        # UI格式：文本输入被转换为连线时沿连线查找，否则取第一个字符串控件值
+        for name in TEXT_INPUTS:
+            upstream, _ = self.source(node, name)
+            if upstream is not None:
+                return self.node_text(upstream, depth + 1)
+        for value in node.get("widgets_values") or ():
+            if isinstance(value, str):
+                return value
+        return None
+
+    def trace_conditioning(self, node, slot=0, depth=0):
+        """
+        从条件节点向上游追踪到文本编码节点，返回找到的文本列表
+        同时有 positive / negative 输入的节点（如ControlNet）按输出序号只追踪对应的一路
+        """
+        if node is None or depth > MAX_TRACE_DEPTH:
+            return []
+        names = self._conditioning_inputs(node)
+        if not names:
+            text = self.node_text(node, depth)
+            return [text] if text is not None else []
+        if "positive" in names and "negative" in names:
+            names = ["negative" if slot == 1 else "positive"]
+        texts = []
+        for name in names:
+            upstream, upstream_slot = self.source(node, name)
+            texts.extend(self.trace_conditioning(upstream, upstream_slot or 0, depth + 1))
+        return texts
+
+    def sampler_prompts(self):
+        """
+        找到第一个采样器节点，沿它的 positive / negative 连线追踪提示词
+        返回 (positive, negative)，未找到时为空字符串
+        """
+        for sampler_type in SAMPLER_TYPES:
+            for node in self.nodes:
+                if isinstance(node, dict) and self.node_type(node) == sampler_type:
+                    prompts = []
+                    for name in ("positive", "negative"):
+                        upstream, slot = self.source(node, name)
+                        texts = self.trace_conditioning(upstream, slot or 0)
+                        prompts.append(", ".join(dict.fromkeys(text.strip() for text in texts if text.strip())))
+                    return tuple(prompts)
+        return "", ""
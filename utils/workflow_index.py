@@ -0,0 +1,219 @@
+"""
+图片workflow元数据的持久化全文索引（SQLite FTS5）
+记录输入/输出目录中每张图片的正向/负向提示词、checkpoint名称和节点类型统计，
+刷新时只重新读取大小或修改时间变化的文件，查询不需要再打开任何图片
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+from .image_helpers import count_node_types
+from .image_ingest import IMAGE_EXTENSIONS, ingest_image
+from .workflow_parser import WorkflowParser
+
+# 表结构变化时递增，旧的索引会被重建
+SCHEMA_VERSION = 2
+
+# 每处理这么多文件提交一次事务
+COMMIT_EVERY = 500
+
+# 默认的unicode61分词会在 / . _ - 处切分，"sdxl/juggernaut_v9.safetensors" 可以用 juggernaut 或 v9 查到
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS images (
+    id INTEGER PRIMARY KEY,
+    root TEXT NOT NULL,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    positive TEXT NOT NULL DEFAULT '',
+    filtered_positive TEXT NOT NULL DEFAULT '',
+    negative TEXT NOT NULL DEFAULT '',
+    checkpoint TEXT NOT NULL DEFAULT '',
+    node_count INTEGER NOT NULL DEFAULT 0,
+    node_types TEXT NOT NULL DEFAULT '{}',
+    error TEXT NOT NULL DEFAULT '',
+    UNIQUE (root, path)
+);
+CREATE INDEX IF NOT EXISTS images_checkpoint ON images (checkpoint);
+CREATE VIRTUAL TABLE IF NOT EXISTS images_fts USING fts5 (
+    path, positive, filtered_positive, negative, checkpoint, node_type_names,
+    content='', tokenize="unicode61"
+);
+"""
+
+RESULT_COLUMNS = ("root", "path", "size", "mtime_ns", "positive", "filtered_positive", "negative",
+                  "checkpoint", "node_count", "node_types", "error")
+
+
+def _fts_row(path, record):
+    return (path, record["positive"], record["filtered_positive"], record["negative"],
+            record["checkpoint"], " ".join(json.loads(record["node_types"])))
+
+
+def _quote_query(text):
+    # 把每个词作为短语查询，用于用户输入不符合FTS5语法的情况
+    return " ".join('"' + token.replace('"', '""') + '"' for token in text.split())
+
+
+class WorkflowMetadataIndex:
+    """
+    roots为 {名称: 目录}，例如 {"input": 输入目录, "output": 输出目录}；索引保存在db_path
+    """
+    def __init__(self, db_path, roots, parser=None):
+        self.db_path = db_path
+        self.roots = {name: os.path.abspath(path) for name, path in roots.items()}
+        self.parser = parser or WorkflowParser()
+        self.last_refresh = 0.0
+        self._refresh_lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        with closing(self._connect()) as conn:
+            if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                conn.executescript("DROP TABLE IF EXISTS images; DROP TABLE IF EXISTS images_fts;")
+            conn.executescript(SCHEMA)
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            conn.commit()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        # WAL模式下刷新索引时仍然可以查询
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        return conn
+
+    def _walk(self, directory):
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        yield from self._walk(entry.path)
+                    elif entry.name.lower().endswith(IMAGE_EXTENSIONS) and entry.is_file():
+                        yield entry
+        except OSError:
+            return
+
+    def read_record(self, image_path):
+        """
+        读取一张图片的元数据（不解码像素），返回要写入索引的字段
+        """
+        record = {"positive": "", "filtered_positive": "", "negative": "", "checkpoint": "",
+                  "node_count": 0, "node_types": "{}", "error": ""}
+        try:
+            ingest = ingest_image(image_path, decode_pixels=False)
+            if ingest.workflow_data is not None or ingest.prompt_data is not None:
+                (record["positive"], record["filtered_positive"], record["negative"],
+                 record["checkpoint"]) = self.parser.parse_image_workflows(ingest.prompt_data, ingest.workflow_data)
+                # 节点统计优先使用完整的UI格式workflow
+                node_types, _ = count_node_types(ingest.workflow_data if isinstance(ingest.workflow_data, dict) else ingest.prompt_data)
+                record["node_count"] = sum(node_types.values())
+                record["node_types"] = json.dumps(node_types, ensure_ascii=False)
+        except Exception as e:
+            record["error"] = str(e)
+        return record
+
+    def _delete(self, conn, row_id, old):
+        # 无内容的FTS5表需要用原来的值执行 'delete'
+        conn.execute("INSERT INTO images_fts (images_fts, rowid, path, positive, filtered_positive, negative, checkpoint, node_type_names)"
+                     " VALUES ('delete', ?, ?, ?, ?, ?, ?, ?)", (row_id,) + _fts_row(old["path"], old))
+        conn.execute("DELETE FROM images WHERE id = ?", (row_id,))
+
+    def refresh(self):
+        """
+        刷新索引：只读取新增或大小/修改时间变化的文件，删除已不存在的文件
+        返回 {"updated": 重新读取的文件数, "removed": 删除的文件数}
+        """
+        with self._refresh_lock, closing(self._connect()) as conn:
+            conn.row_factory = sqlite3.Row
+            updated = removed = pending = 0
+            for root_name, root_dir in self.roots.items():
+                known = {row["path"]: row for row in conn.execute(
+                    "SELECT id, path, size, mtime_ns, positive, filtered_positive, negative, checkpoint, node_types"
+                    " FROM images WHERE root = ?", (root_name,))}
+                seen = set()
+                for entry in self._walk(root_dir):
+                    rel_path = os.path.relpath(entry.path, root_dir).replace(os.sep, "/")
+                    seen.add(rel_path)
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    old = known.get(rel_path)
+                    if old is not None and old["size"] == st.st_size and old["mtime_ns"] == st.st_mtime_ns:
+                        continue
+                    if old is not None:
+                        self._delete(conn, old["id"], old)
+                    record = self.read_record(entry.path)
+                    cursor = conn.execute(
+                        "INSERT INTO images (root, path, size, mtime_ns, positive, filtered_positive, negative, checkpoint,"
+                        " node_count, node_types, error) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (root_name, rel_path, st.st_size, st.st_mtime_ns, record["positive"], record["filtered_positive"],
+                         record["negative"], record["checkpoint"], record["node_count"], record["node_types"], record["error"]))
+                    conn.execute("INSERT INTO images_fts (rowid, path, positive, filtered_positive, negative, checkpoint, node_type_names)"
+                                 " VALUES (?, ?, ?, ?, ?, ?, ?)", (cursor.lastrowid,) + _fts_row(rel_path, record))
+                    updated += 1
+                    pending += 1
+                    if pending >= COMMIT_EVERY:
+                        conn.commit()
+                        pending = 0
+
+                for rel_path in known.keys() - seen:
+                    old = known[rel_path]
+                    self._delete(conn, old["id"], old)
+                    removed += 1
+                conn.commit()
+
+            # 删除已不再配置的目录的记录
+            placeholders = ",".join("?" * len(self.roots))
+            for row in conn.execute(f"SELECT id, path, positive, filtered_positive, negative, checkpoint, node_types FROM images"
+                                    f" WHERE root NOT IN ({placeholders})", tuple(self.roots)).fetchall():
+                self._delete(conn, row["id"], row)
+                removed += 1
+            conn.commit()
+            self.last_refresh = time.time()
+            return {"updated": updated, "removed": removed}
+
+    def search(self, query="", limit=100, checkpoint=None, root=None):
+        """
+        全文查询：query使用FTS5语法（例如 "cat AND checkpoint:sdxl*"），语法错误时按普通词语查询
+        checkpoint / root 为精确过滤条件；query为空时按修改时间倒序列出
+        """
+        conditions, params = [], []
+        if checkpoint:
+            conditions.append("images.checkpoint = ?")
+            params.append(checkpoint)
+        if root:
+            conditions.append("images.root = ?")
+            params.append(root)
+        columns = ", ".join(f"images.{column}" for column in RESULT_COLUMNS)
+        with closing(self._connect()) as conn:
+            conn.row_factory = sqlite3.Row
+            query = query.strip()
+            if not query:
+                where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+                rows = conn.execute(f"SELECT {columns} FROM images {where} ORDER BY images.mtime_ns DESC LIMIT ?",
+                                    params + [limit]).fetchall()
+            else:
+                sql = (f"SELECT {columns} FROM images_fts JOIN images ON images.id = images_fts.rowid"
+                       f" WHERE images_fts MATCH ? {''.join(' AND ' + c for c in conditions)}"
+                       f" ORDER BY bm25(images_fts) LIMIT ?")
+                try:
+                    rows = conn.execute(sql, [query] + params + [limit]).fetchall()
+                except sqlite3.OperationalError:
+                    rows = conn.execute(sql, [_quote_query(query)] + params + [limit]).fetchall()
+        results = []
+        for row in rows:
+            result = dict(row)
+            result["node_types"] = json.loads(result["node_types"])
+            results.append(result)
+        return results
+
+    def checkpoints(self):
+        """
+        返回 [(checkpoint名称, 图片数量)]，按数量倒序
+        """
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT checkpoint, COUNT(*) FROM images WHERE checkpoint != ''"
+                                " GROUP BY checkpoint ORDER BY COUNT(*) DESC").fetchall()
@@ -0,0 +1,293 @@
+"""
+Workflow解析器
+只遍历一次节点列表，按标题、类型（包括旧的 "Node name for S&R" 属性）和 cnr_id 建立索引，
+再由声明式的提取规则表从索引中取值。增加要提取的字段只需要增加规则，不会增加遍历次数
+UI格式和API格式（PNG中的 "prompt"）都可以解析，标题规则找不到提示词时沿采样器的 positive / negative 连线追踪
+"""
+
+from dataclasses import dataclass
+
+from .fingerprint import text_fingerprint
+from .json_backend import loads
+from .tensor_cache import TensorLRUCache, env_int
+from .workflow_graph import TEXT_INPUTS, WorkflowGraph
+
+
+@dataclass(frozen=True)
+class ExtractionRule:
+    """
+    一条提取规则：在 match 索引中找 value 对应的节点，从 widgets_values 中按顺序尝试 widget_indices 取值
+    API格式的节点没有widgets_values，按顺序尝试 inputs 中的 input_names（连线会解析为上游节点的值）
+    - match: "title" / "type" / "cnr_id"；"type" 同时匹配节点的type和 "Node name for S&R" 属性
+    - cnr_widget_indices: 按节点 cnr_id 覆盖 widget_indices，例如 (("rgthree-comfy", (0,)),)
+    - pick: "first" 取第一个匹配的节点，"last" 取最后一个，"all" 返回所有值的列表
+    - value_types: 只接受这些类型的值
+    """
+    field: str
+    match: str
+    value: str
+    widget_indices: tuple = (0,)
+    cnr_widget_indices: tuple = ()
+    pick: str = "first"
+    value_types: tuple = (str,)
+    strip: bool = False
+    input_names: tuple = ()
+
+    def indices_for(self, cnr_id):
+        for rule_cnr_id, indices in self.cnr_widget_indices:
+            if rule_cnr_id == cnr_id:
+                return indices
+        return self.widget_indices
+
+    def read(self, node, cnr_id, graph=None):
+        """
+        从一个节点中读取值，没有符合条件的值时返回None
+        """
+        if graph is not None and graph.api:
+            inputs = node.get("inputs")
+            if not isinstance(inputs, dict):
+                return None
+            candidates = (graph.literal(inputs[name]) for name in self.input_names if name in inputs)
+        else:
+            widgets_values = node.get("widgets_values")
+            if not isinstance(widgets_values, list):
+                return None
+            candidates = (widgets_values[index] for index in self.indices_for(cnr_id) if index < len(widgets_values))
+        for value in candidates:
+            if isinstance(value, self.value_types):
+                return value.strip() if self.strip and isinstance(value, str) else value
+        return None
+
+
+def _prompt_rule(title):
+    # rgthree-comfy 节点的提示词在 widgets_values[0]，其他节点先尝试 index 1 再尝试 index 0
+    # API格式按 TEXT_INPUTS 读取，标题写在字符串节点（例如 PrimitiveString 的 value）上时也能找到
+    return ExtractionRule(title, "title", title, widget_indices=(1, 0),
+                          cnr_widget_indices=(("rgthree-comfy", (0,)),), pick="last", strip=True,
+                          input_names=TEXT_INPUTS)
+
+
+# parse_workflow_data 返回的四个字段
+DEFAULT_RULES = (
+    _prompt_rule("positive_prompt"),
+    _prompt_rule("filtered_positive_prompt"),
+    _prompt_rule("negative_prompt"),
+    ExtractionRule("checkpoint_name", "type", "CheckpointLoaderSimple", input_names=("ckpt_name",)),
+)
+
+# 可选的扩展规则，例如 WorkflowParser(DEFAULT_RULES + LORA_RULES + SAMPLER_RULES)
+LORA_RULES = (
+    ExtractionRule("lora_names", "type", "LoraLoader", pick="all", input_names=("lora_name",)),
+    ExtractionRule("lora_names", "type", "LoraLoaderModelOnly", pick="all", input_names=("lora_name",)),
+)
+
+# KSampler的widgets_values: [seed, control_after_generate, steps, cfg, sampler_name, scheduler, denoise]
+SAMPLER_RULES = (
+    ExtractionRule("seed", "type", "KSampler", widget_indices=(0,), value_types=(int,), input_names=("seed",)),
+    ExtractionRule("steps", "type", "KSampler", widget_indices=(2,), value_types=(int,), input_names=("steps",)),
+    ExtractionRule("cfg", "type", "KSampler", widget_indices=(3,), value_types=(int, float), input_names=("cfg",)),
+    ExtractionRule("sampler_name", "type", "KSampler", widget_indices=(4,), input_names=("sampler_name",)),
+    ExtractionRule("scheduler", "type", "KSampler", widget_indices=(5,), input_names=("scheduler",)),
+)
+
+PROMPT_FIELDS = ("positive_prompt", "filtered_positive_prompt", "negative_prompt", "checkpoint_name")
+
+
+def _cnr_id(node):
+    properties = node.get("properties")
+    return properties.get("cnr_id") if isinstance(properties, dict) else None
+
+
+class WorkflowIndex:
+    """
+    一次遍历建立的节点索引：{title: [...]}、{type: [...]}、{cnr_id: [...]}
+    列表元素为 (节点在workflow中的位置, node)，保持节点原有的顺序
+    keys为 {"title": set, "type": set, "cnr_id": set} 时只索引规则用到的值，None表示全部索引
+    """
+    def __init__(self, graph, keys=None):
+        self.by_title = {}
+        self.by_type = {}
+        self.by_cnr_id = {}
+        titles, types, cnr_ids = (keys["title"], keys["type"], keys["cnr_id"]) if keys is not None else (None, None, None)
+        api = graph.api
+        for position, node in enumerate(graph.nodes):
+            if not isinstance(node, dict):
+                continue
+            if api:
+                # API格式的标题在 _meta 中，类型为 class_type，没有properties
+                title, node_type = graph.title(node), node.get("class_type")
+                if isinstance(title, str) and (titles is None or title in titles):
+                    self.by_title.setdefault(title, []).append((position, node))
+                if isinstance(node_type, str) and (types is None or node_type in types):
+                    self.by_type.setdefault(node_type, []).append((position, node))
+                continue
+            title = node.get("title")
+            if isinstance(title, str) and (titles is None or title in titles):
+                self.by_title.setdefault(title, []).append((position, node))
+            node_type = node.get("type")
+            if isinstance(node_type, str) and (types is None or node_type in types):
+                self.by_type.setdefault(node_type, []).append((position, node))
+            properties = node.get("properties")
+            if properties and isinstance(properties, dict):
+                # 兼容旧的 'Node name for S&R' 属性
+                sr_name = properties.get("Node name for S&R")
+                if isinstance(sr_name, str) and sr_name != node_type and (types is None or sr_name in types):
+                    self.by_type.setdefault(sr_name, []).append((position, node))
+                cnr_id = properties.get("cnr_id")
+                if isinstance(cnr_id, str) and (cnr_ids is None or cnr_id in cnr_ids):
+                    self.by_cnr_id.setdefault(cnr_id, []).append((position, node))
+
+    def lookup(self, match, value):
+        table = {"title": self.by_title, "type": self.by_type, "cnr_id": self.by_cnr_id}[match]
+        return table.get(value, ())
+
+
+class WorkflowParser:
+    """
+    一个可重用的工作流解析器，用于提取提示词和模型信息。
+    rules为提取规则，默认是 DEFAULT_RULES；version随规则变化，可用作解析结果缓存键的一部分
+    trace_samplers为True时，标题规则没有找到的 positive_prompt / negative_prompt 从采样器的连线追踪
+    """
+    def __init__(self, rules=None, trace_samplers=True):
+        self.rules = tuple(rules) if rules is not None else DEFAULT_RULES
+        self.trace_samplers = trace_samplers
+        for rule in self.rules:
+            if rule.match not in ("title", "type", "cnr_id") or rule.pick not in ("first", "last", "all"):
+                raise ValueError(f"无效的提取规则: {rule}")
+        self.fields = tuple(dict.fromkeys(rule.field for rule in self.rules))
+        # 预先整理出规则用到的索引键，建立索引时忽略其他节点
+        self.index_keys = {"title": set(), "type": set(), "cnr_id": set()}
+        for rule in self.rules:
+            self.index_keys[rule.match].add(rule.value)
+        self.version = text_fingerprint(repr((self.rules, self.trace_samplers)))
+
+    def extract(self, workflow_data):
+        """
+        按规则提取所有字段，返回 {field: value}；workflow_data可以是UI格式或API格式
+        未找到的字段为空字符串，pick为 "all" 的字段为列表
+        """
+        graph = WorkflowGraph(workflow_data)
+        results = self.apply_rules(graph)
+        if self.trace_samplers:
+            self.fill_from_samplers(graph, results)
+        return results
+
+    def apply_rules(self, graph):
+        """
+        只按提取规则（标题/类型/cnr_id）提取字段，不追踪采样器，返回 {field: value}
+        """
+        index = WorkflowIndex(graph, self.index_keys)
+
+        found = {}  # field -> (节点位置, 值)
+        collected = {}
+        for rule in self.rules:
+            candidates = index.lookup(rule.match, rule.value)
+            if rule.pick == "all":
+                values = collected.setdefault(rule.field, [])
+                for position, node in candidates:
+                    value = rule.read(node, _cnr_id(node), graph)
+                    if value is not None:
+                        values.append((position, value))
+                continue
+
+            for position, node in (reversed(candidates) if rule.pick == "last" else candidates):
+                value = rule.read(node, _cnr_id(node), graph)
+                if value is None:
+                    continue
+                # 多条规则写入同一字段时，first取位置靠前的节点，last取位置靠后的节点
+                previous = found.get(rule.field)
+                if previous is None or (position < previous[0]) == (rule.pick == "first"):
+                    found[rule.field] = (position, value)
+                break
+
+        results = {field: value for field, (_, value) in found.items()}
+        for field, values in collected.items():
+            results[field] = [value for _, value in sorted(values, key=lambda item: item[0])]
+        for field in self.fields:
+            results.setdefault(field, "")
+        return results
+
+    @staticmethod
+    def fill_from_samplers(graph, results):
+        """
+        规则没有找到的 positive_prompt / negative_prompt 从采样器的连线追踪补充（原地修改results）
+        """
+        if results.get("positive_prompt", True) and results.get("negative_prompt", True):
+            return
+        for field, value in zip(("positive_prompt", "negative_prompt"), graph.sampler_prompts()):
+            if field in results and not results[field]:
+                results[field] = value
+
+    def parse_image_workflows(self, prompt_data, workflow_data):
+        """
+        解析图片中保存的两份数据：API格式的 prompt_data 和UI格式的 workflow_data
+        先在两份数据上应用提取规则（API格式优先，缺少的字段例如只在UI标题中出现的 filtered_positive_prompt 从UI格式补充），
+        规则仍未找到的提示词最后才从采样器的连线追踪，因此明确命名的节点总是优先于采样器的输入
+        """
+        try:
+            graphs = [WorkflowGraph(data) for data in (prompt_data, workflow_data) if data]
+            results = {}
+            for graph in graphs:
+                for field, value in self.apply_rules(graph).items():
+                    if not results.get(field):
+                        results[field] = value
+                if all(results.get(field) for field in PROMPT_FIELDS):
+                    break
+            if self.trace_samplers:
+                for graph in graphs:
+                    self.fill_from_samplers(graph, results)
+            return tuple(results.get(field, "") for field in PROMPT_FIELDS)
+        except Exception as e:
+            print(f"解析workflow时出错: {e}")
+        return "", "", "", ""
+
+    def memo_key(self, *texts):
+        """
+        解析结果缓存的键：规则版本加上各段原始文本的哈希
+        """
+        return (self.version,) + tuple(text_fingerprint(text) if text else None for text in texts)
+
+    def parse_workflow_text(self, workflow_text):
+        """
+        解析workflow JSON字符串，相同内容再次解析时直接返回缓存的结果，只需要计算一次哈希
+        JSON格式错误时抛出 json_backend.JSONDecodeError 中的异常（不会缓存）
+        """
+        key = self.memo_key(workflow_text)
+        results = PARSE_MEMO.get(key)
+        if results is None:
+            results = self.parse_workflow_data(loads(workflow_text))
+            PARSE_MEMO.put(key, results)
+        return results
+
+    def parse_image_workflows_cached(self, prompt_text, prompt_data, workflow_text, workflow_data):
+        """
+        带缓存的 parse_image_workflows，以两段原始文本的哈希为键
+        prompt_data / workflow_data 为None时在未命中缓存时才从对应的文本解析
+        """
+        key = self.memo_key(prompt_text, workflow_text)
+        results = PARSE_MEMO.get(key)
+        if results is None:
+            if prompt_data is None and prompt_text:
+                prompt_data = loads(prompt_text)
+            if workflow_data is None and workflow_text:
+                workflow_data = loads(workflow_text)
+            results = self.parse_image_workflows(prompt_data, workflow_data)
+            PARSE_MEMO.put(key, results)
+        return results
+
+    def parse_workflow_data(self, workflow_data):
+        """
+        解析workflow JSON（UI格式或API格式），提取提示词和检查点名称
+        """
+        try:
+            results = self.extract(workflow_data)
+            return tuple(results.get(field, "") for field in PROMPT_FIELDS)
+        except Exception as e:
+            print(f"解析workflow时出错: {e}")
+        return "", "", "", ""
+
+
+# 进程内共享的解析结果缓存，只按条目数限制；值是不可变的提示词元组，命中时直接返回，不复制
+# LATENT_INPUT_PARSE_MEMO_ENTRIES=0 时禁用
+PARSE_MEMO = TensorLRUCache(None, name="workflow_parse", max_entries=env_int("LATENT_INPUT_PARSE_MEMO_ENTRIES", 256),
+                            copy=None)